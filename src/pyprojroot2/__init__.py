@@ -1,4 +1,4 @@
-from .core_criteria import RootCriterion
+from .core_criteria import RootCriterion, clear_root_cache
 from .generic_criteria import as_root_criterion
 from .predefined_criteria import (
     has_dir,
@@ -54,6 +54,7 @@ __all__ = [
     # pyprojroot2
     # core
     "RootCriterion",
+    "clear_root_cache",
     # other more pythonic prespecified criteria
     "py_here_criteria",
     "r_here_criteria",
@@ -1,19 +1,249 @@
-import abc
 import functools
 import os
 import pathlib
+import stat
+import sys
 import typing
 
 PathSpec = typing.Union[str, pathlib.Path]
+TestFun = typing.Callable[[PathSpec, typing.Optional["DirIndex"]], bool]
+T = typing.TypeVar("T")
 
+# names match the listed names exactly, not so on case insensitive (Windows,
+# macOS by default) and unicode normalising (macOS) file systems
+_EXACT_NAMES = os.path.normcase("A") == "A" and sys.platform != "darwin"
 
-class RootCriterion(abc.ABC):
+
+def as_path(path: PathSpec) -> pathlib.Path:
+    """
+    Returns ``path`` as ``pathlib.Path``, without copying a ``Path``.
+    """
+    if isinstance(path, pathlib.Path):
+        return path
+    return pathlib.Path(path)
+
+
+class DirIndex:
+    """
+    The entries of a directory, listed at most once with ``os.scandir``.
+
+    Criteria testing the same directory share one index, so a file name or
+    directory name check is a dictionary lookup instead of a ``stat`` call.
+    The file types are taken from the ``os.DirEntry`` objects, which know the
+    type from the directory listing on most platforms.
+
+    Names with path separators (e.g. ``.vscode/settings.json``) and
+    directories which can't be listed fall back to a ``stat`` call, which is
+    done once per name, e.g. for ``HasDir(".git") | HasFile(".git")``. So do
+    names not listed on file systems which don't compare names exactly, e.g.
+    ``setup.py`` may be ``Setup.py`` on Windows.
+
+    ``scan=False`` never lists the directory, it is used when testing a
+    single criterion against a directory.
+
+    Files read by criteria are kept as well, criteria checking the contents
+    of the same file read it once.
+    """
+
+    __slots__ = ("dir", "scan", "_entries", "_scanned", "_modes", "_files")
+
+    def __init__(self, dir: PathSpec, scan: bool = True):
+        self.dir = dir
+        self.scan = scan
+        self._entries: typing.Optional[typing.Dict[str, "os.DirEntry[str]"]] = None
+        self._scanned = False
+        self._modes: typing.Dict[str, typing.Optional[int]] = {}
+        self._files: typing.Optional[
+            typing.Dict[typing.Tuple[str, typing.Hashable], typing.Any]
+        ] = None
+
+    @property
+    def entries(self) -> typing.Optional[typing.Dict[str, "os.DirEntry[str]"]]:
+        """
+        The directory entries by name, None if the directory wasn't listed.
+        """
+        if self.scan and not self._scanned:
+            self._scanned = True
+            try:
+                with os.scandir(self.dir) as dir_entries:
+                    self._entries = {entry.name: entry for entry in dir_entries}
+            except OSError:
+                # e.g. directory without read permission, fall back to stat
+                self._entries = None
+        return self._entries
+
+    @staticmethod
+    def is_plain_name(name: PathSpec) -> bool:
+        """
+        Tests whether ``name`` can be an entry of the directory's listing.
+        """
+        name = os.fspath(name)
+        if name in ("", ".", "..") or os.sep in name:
+            return False
+        return os.altsep is None or os.altsep not in name
+
+    def _lookup(
+        self, name: PathSpec
+    ) -> typing.Tuple[bool, typing.Optional["os.DirEntry[str]"]]:
+        """
+        Look up an entry, the first value is False if the index can't tell.
+        """
+        name = os.fspath(name)
+        if not self.is_plain_name(name):
+            return False, None
+        entries = self.entries
+        if entries is None:
+            return False, None
+        entry = entries.get(name)
+        if entry is None and not _EXACT_NAMES:
+            # the file system may know it by another spelling
+            return False, None
+        return True, entry
+
+    def _stat_mode(self, name: PathSpec) -> typing.Optional[int]:
+        """
+        The file mode of the entry (following symlinks), None if it's missing.
+
+        Plain names are stat'ed via ``os.path.join``, other names use
+        ``pathlib`` to keep its path normalisation (e.g. ``myfile/``).
+        """
+        name = os.fspath(name)
+        if name in self._modes:
+            return self._modes[name]
+        if self.is_plain_name(name):
+            path: PathSpec = os.path.join(self.dir, name)
+        else:
+            path = as_path(self.dir) / name
+        try:
+            mode: typing.Optional[int] = os.stat(path).st_mode
+        except (OSError, ValueError):
+            mode = None
+        self._modes[name] = mode
+        return mode
+
+    def is_file(self, name: PathSpec) -> bool:
+        """
+        Tests whether ``name`` is a file (or a symlink to a file).
+        """
+        indexed, entry = self._lookup(name)
+        if not indexed:
+            mode = self._stat_mode(name)
+            return mode is not None and stat.S_ISREG(mode)
+        return entry is not None and entry.is_file()
+
+    def is_dir(self, name: PathSpec) -> bool:
+        """
+        Tests whether ``name`` is a directory (or a symlink to a directory).
+        """
+        indexed, entry = self._lookup(name)
+        if not indexed:
+            mode = self._stat_mode(name)
+            return mode is not None and stat.S_ISDIR(mode)
+        return entry is not None and entry.is_dir()
+
+    def exists(self, name: PathSpec) -> bool:
+        """
+        Tests whether the entry ``name`` exists.
+        """
+        indexed, entry = self._lookup(name)
+        if not indexed:
+            return self._stat_mode(name) is not None
+        # pathlib.Path.exists follows symlinks
+        return entry is not None and (not entry.is_symlink() or os.path.exists(entry))
+
+    def read_file(
+        self,
+        file: PathSpec,
+        mode: typing.Hashable,
+        read: typing.Callable[[PathSpec], T],
+    ) -> T:
+        """
+        Returns ``read(file)``, the file is only read once per ``mode``.
+
+        ``mode`` must identify the result of ``read``, e.g. the number of
+        lines read.
+        """
+        if self._files is None:
+            self._files = {}
+        key = (os.fspath(file), mode)
+        if key not in self._files:
+            self._files[key] = read(file)
+        return typing.cast(T, self._files[key])
+
+    def is_read(self, file: PathSpec, mode: typing.Hashable) -> bool:
+        """
+        Tests whether ``read_file`` has read the file in this ``mode``.
+        """
+        return self._files is not None and (os.fspath(file), mode) in self._files
+
+    def iter_files(
+        self, match: typing.Optional[typing.Callable[[str], typing.Any]] = None
+    ) -> typing.Iterator[pathlib.Path]:
+        """
+        Iterate over the files (or symlinks to files) in the directory.
+
+        ``match`` selects the files by name. The names are filtered before the
+        file types are checked and paths are built.
+        """
+        entries = self.entries
+        if entries is None:
+            for f in as_path(self.dir).iterdir():
+                if (match is None or match(f.name)) and f.is_file():
+                    yield f
+            return
+        dir_path = as_path(self.dir)
+        for name in entries if match is None else filter(match, entries):
+            if entries[name].is_file():
+                yield dir_path / name
+
+
+class RootCriterion:
     """
-    Abstract base class of a root-criterion.
+    Base class of a root-criterion.
 
     A criterion tests whether it applies to a given path.
+
+    The criteria of this package use ``__slots__``, the class attributes
+    below are defaults for subclasses.
     """
 
+    __slots__ = ()
+
+    # rough estimate of the test's expense, 1 being a single stat call,
+    # combined criteria test their cheaper children first
+    cost: int = 5
+
+    # the outcome depends on more than the file system, e.g. the current
+    # directory, hence the root search results must not be cached; criteria
+    # are volatile unless known to test the file system only, e.g. test
+    # functions of users are
+    volatile: bool = True
+
+    # directories known not to meet a criterion, shared by all criteria
+    _negative_cache: typing.ClassVar[typing.Set[typing.Tuple["RootCriterion", str]]] = (
+        set()
+    )
+    _negative_cache_size: typing.ClassVar[int] = 4096
+
+    # set for subclasses overriding the public ``test`` (``test_with_reason``)
+    # below the indexed implementation, these are tested by the public method
+    _public_test: typing.ClassVar[bool] = False
+    _public_test_with_reason: typing.ClassVar[bool] = False
+
+    def __init_subclass__(cls, **kwargs: typing.Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._public_test = _overrides_public(cls, "test", "_test_indexed")
+        cls._public_test_with_reason = _overrides_public(
+            cls, "test_with_reason", "_test_with_reason_indexed"
+        )
+        if (
+            (cls._public_test or cls._public_test_with_reason)
+            and "volatile" not in vars(cls)
+            and isinstance(cls.volatile, bool)
+        ):
+            # e.g. a user's subclass of HasFile, nothing known about its test
+            cls.volatile = True
+
     def describe(self) -> str:
         """
         Describes the test criterion.
@@ -23,12 +253,91 @@ class RootCriterion(abc.ABC):
     def __repr__(self) -> str:
         return f"<RootCriterion: {self.describe().capitalize()}>"
 
-    @abc.abstractmethod
+    def name_check(self) -> typing.Optional[typing.Tuple[str, str]]:
+        """
+        The ``DirIndex`` method and entry name equivalent to this criterion.
+
+        Criteria which are just a check of a plain entry name, e.g.
+        ``("is_file", "setup.py")``, can be tested together with other such
+        criteria. None if the criterion is anything else.
+        """
+        return None
+
+    def entries_only(self) -> bool:
+        """
+        Tests whether the outcome only depends on the names and types of the
+        directory's own entries (or its path), i.e. the test can only change
+        together with the directory's modification time.
+
+        False if files are read or names with subdirectories are tested.
+        """
+        return False
+
+    def candidate_dirs(self, dirs: typing.Tuple[str, ...]) -> typing.Tuple[str, ...]:
+        """
+        The search directories which can meet this criterion at all.
+
+        Criteria decided by the path alone, e.g. ``HasBasename``, narrow the
+        root search down before any directory is tested. The default keeps
+        all directories and returns ``dirs`` itself.
+        """
+        return dirs
+
+    def new_index(self, dir: PathSpec) -> DirIndex:
+        """
+        The index to test ``dir`` with during the root search.
+
+        A single entry name check is one ``stat`` call, listing the directory
+        only pays off for other and combined criteria.
+        """
+        return DirIndex(dir, scan=self.name_check() is None)
+
+    def compile_test(self) -> TestFun:
+        """
+        Returns a function equivalent to ``_search_test``.
+
+        Combined criteria return a closure over their children's compiled
+        tests, so testing a tree of criteria doesn't look up the ``test``
+        method of every node for every directory.
+        """
+        if self._public_test:
+            test = self.test
+
+            def public_test(dir: PathSpec, index: typing.Optional[DirIndex]) -> bool:
+                return test(dir)
+
+            return public_test
+        return self._test_indexed
+
     def test(self, dir: PathSpec) -> bool:
         """
         Tests whether the criterion is met for ``path``.
+
+        Must be implemented by the derived classes, unless they implement
+        ``_test_indexed``.
         """
-        ...
+        return self._test_indexed(dir, None)
+
+    def _test_indexed(self, dir: PathSpec, index: typing.Optional[DirIndex]) -> bool:
+        """
+        Tests ``dir`` with its ``index``, the (lazily created) listing of
+        ``dir`` shared by all criteria tested against ``dir`` during a root
+        search.
+
+        The criteria of this package implement this, the default calls
+        ``test``, which doesn't take the index.
+        """
+        if type(self).test is RootCriterion.test:
+            raise NotImplementedError(f"{type(self).__name__}.test")
+        return self.test(dir)
+
+    def _search_test(self, dir: PathSpec, index: typing.Optional[DirIndex]) -> bool:
+        """
+        Tests ``dir`` as the root search and combined criteria do.
+        """
+        if self._public_test:
+            return self.test(dir)
+        return self._test_indexed(dir, index)
 
     def test_with_reason(self, dir: PathSpec) -> typing.Tuple[bool, str]:
         """
@@ -40,11 +349,29 @@ class RootCriterion(abc.ABC):
         reason should contain a statement why it failed, i.e. the negation of
         the successful reason.
         """
-        if self.test(dir):
+        return self._test_with_reason_indexed(dir, None)
+
+    def _test_with_reason_indexed(
+        self, dir: PathSpec, index: typing.Optional[DirIndex]
+    ) -> typing.Tuple[bool, str]:
+        """
+        ``test_with_reason`` with the index of ``dir``, see ``_test_indexed``.
+        """
+        if self._search_test(dir, index):
             return True, self.describe()
         # awkward to read, but easy to implement
         return False, f"not ({self.describe()})"
 
+    def _search_test_with_reason(
+        self, dir: PathSpec, index: typing.Optional[DirIndex]
+    ) -> typing.Tuple[bool, str]:
+        """
+        Tests ``dir`` with reason as the root search and combined criteria do.
+        """
+        if self._public_test_with_reason:
+            return self.test_with_reason(dir)
+        return self._test_with_reason_indexed(dir, index)
+
     @staticmethod
     def get_start_path(
         path: PathSpec = ".", resolve_path: bool = False
@@ -54,16 +381,13 @@ class RootCriterion(abc.ABC):
 
         ``resolve_path`` will use pathlib.resolve_path to get an absolute start
         path. Otherwise ``os.path.abspath`` is used (default).
+
+        The result is cached, relative paths per current working directory.
         """
-        if resolve_path:
-            abspath = pathlib.Path(path).resolve()
-        else:
-            abspath = pathlib.Path(os.path.abspath(path))
-        if not abspath.exists():
-            raise FileNotFoundError(f"`{path}` does not exist.")
-        if not abspath.is_dir():
-            return abspath.parent
-        return abspath
+        path = os.fspath(path)
+        # relative paths depend on the current working directory
+        cwd = "" if os.path.isabs(path) else os.getcwd()
+        return _get_start_path(cwd, path, resolve_path)
 
     @classmethod
     def list_search_dirs(
@@ -78,10 +402,30 @@ class RootCriterion(abc.ABC):
         Parameters are described in ``find_root``.
         """
         start_path = cls.get_start_path(path, resolve_path)
+        return list(cls.iter_parents(start_path, limit_parents))
+
+    @staticmethod
+    def iter_parents(
+        start_path: pathlib.Path, limit_parents: typing.Union[int, None] = None
+    ) -> typing.Iterator[pathlib.Path]:
+        """
+        Iterate over the start path and its parents, limited by ``limit_parents``.
+
+        The parents are created on demand, the search usually stops early.
+        """
+        yield start_path
+        parents = start_path.parents
         # slicing pathlib.Path.parents is supportered since python-3.10 only
-        return [start_path, *list(start_path.parents)[slice(limit_parents)]]
+        for i in range(len(parents))[slice(limit_parents)]:
+            yield parents[i]
 
-    def find_root(self, *args: typing.Any, **kwargs: typing.Any) -> pathlib.Path:
+    def find_root(
+        self,
+        path: PathSpec = ".",
+        limit_parents: typing.Union[int, None] = None,
+        resolve_path: bool = False,
+        parallel: bool = False,
+    ) -> pathlib.Path:
         """
         Find the project's root.
 
@@ -99,20 +443,210 @@ class RootCriterion(abc.ABC):
         will search only ``src``, ``fancy-project``, and ``projects``. A value
         of 1 will search ``src`` and ``fancy-projects``.
 
+        ``parallel`` tests the directories concurrently in a small thread
+        pool. This can pay off on network file systems, where every directory
+        listing is a round trip. The result is the same as for the sequential
+        search (default).
+
+        Successful results are cached per criterion and start path, as well
+        as the directories not meeting the criterion. Use ``clear_root_cache``
+        after changing the file system. Volatile criteria, e.g. test functions,
+        aren't cached.
 
         Raises FileNotFoundError if no criteria were met.
         """
-        parents = self.list_search_dirs(*args, **kwargs)
+        start_path = self.get_start_path(path, resolve_path)
+        if not self._is_cacheable():
+            return self._find_root(start_path, limit_parents, parallel)
+        return _cached_find_root(self, start_path, limit_parents, parallel)
+
+    def find_root_cached(
+        self,
+        path: PathSpec = ".",
+        limit_parents: typing.Union[int, None] = None,
+        resolve_path: bool = False,
+    ) -> pathlib.Path:
+        """
+        Find the project's root, reusing the previous result while the
+        directories searched are unchanged.
+
+        Unlike ``find_root``, which keeps its results until
+        ``clear_root_cache`` is called, the cached root is validated by the
+        modification times of the directories searched - from the start path
+        up to the root. Adding, removing or renaming entries in them starts
+        a new search. Changes not touching these modification times aren't
+        noticed, e.g. of file contents, of entries in subdirectories (like
+        ``.vscode/settings.json``) or of symlink targets.
+
+        The directories which didn't meet the criterion are skipped by later
+        searches, as long as their modification times are unchanged. This is
+        only done for criteria testing the directories' entries alone, see
+        ``entries_only``, the directories are tested again for others.
+
+        Parameters are described in ``find_root``.
+        """
+        start_path = self.get_start_path(path, resolve_path)
+        if not self._is_cacheable():
+            return self._find_root(start_path, limit_parents)
+        key = (self, start_path, limit_parents)
+        cached = _mtime_cache.get(key)
+        if cached is not None:
+            root, cached_mtimes = cached
+            if all(_get_mtime(dir) == mtime for dir, mtime in cached_mtimes):
+                return root
 
-        for dir in parents:
-            if self.test(dir):
-                return dir
+        test = self.compile_test()
+        # failed directories can only be skipped while unchanged, if the
+        # modification time tells all changes
+        skip_unchanged = self.entries_only()
+        mtimes: typing.List[typing.Tuple[str, typing.Optional[int]]] = []
+        for dir in self._search_dirs(start_path, limit_parents):
+            # taken before testing, changes during the test are noticed later
+            mtime = _get_mtime(dir)
+            mtimes.append((dir, mtime))
+            if (
+                skip_unchanged
+                and mtime is not None
+                and _mtime_negative_cache.get((self, dir)) == mtime
+            ):
+                continue
+            if test(dir, self.new_index(dir)):
+                root = pathlib.Path(dir)
+                if len(_mtime_cache) >= 128:
+                    # crude, but keeps the memory bounded
+                    _mtime_cache.clear()
+                _mtime_cache[key] = root, tuple(mtimes)
+                return root
+            if skip_unchanged and mtime is not None:
+                if len(_mtime_negative_cache) >= self._negative_cache_size:
+                    _mtime_negative_cache.clear()
+                _mtime_negative_cache[(self, dir)] = mtime
+
+        raise FileNotFoundError(
+            f"No root directory found in {start_path} or its parent directories."
+        )
+
+    def _find_root(
+        self,
+        start_path: pathlib.Path,
+        limit_parents: typing.Union[int, None] = None,
+        parallel: bool = False,
+    ) -> pathlib.Path:
+        """
+        Search the root directory without consulting the cache.
+        """
+        if parallel:
+            return self._find_root_parallel(start_path, limit_parents)
+        test = self.compile_test()
+        cacheable = self._is_cacheable()
+        for dir in self._search_dirs(start_path, limit_parents):
+            if cacheable and (self, dir) in self._negative_cache:
+                continue
+            if test(dir, self.new_index(dir)):
+                return pathlib.Path(dir)
+            self._add_to_negative_cache(dir)
+
+        # todo: add criterion to error message
+        raise FileNotFoundError(
+            f"No root directory found in {start_path} or its parent directories."
+        )
+
+    def _find_root_parallel(
+        self,
+        start_path: pathlib.Path,
+        limit_parents: typing.Union[int, None] = None,
+    ) -> pathlib.Path:
+        """
+        Test all search directories concurrently, the closest match wins.
+        """
+        # imports logging among others, only pay for it when used
+        import concurrent.futures
+
+        cacheable = self._is_cacheable()
+        dirs = [
+            dir
+            for dir in self._search_dirs(start_path, limit_parents)
+            if not cacheable or (self, dir) not in self._negative_cache
+        ]
+        test = self.compile_test()
+        if dirs:
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(8, len(dirs))
+            ) as executor:
+                futures = [
+                    executor.submit(test, dir, self.new_index(dir)) for dir in dirs
+                ]
+                for dir, future in zip(dirs, futures):
+                    if future.result():
+                        for pending in futures:
+                            pending.cancel()
+                        return pathlib.Path(dir)
+                    self._add_to_negative_cache(dir)
+
+        # todo: add criterion to error message
+        raise FileNotFoundError(
+            f"No root directory found in {start_path} or its parent directories."
+        )
+
+    def _find_root_with_reason(
+        self,
+        start_path: pathlib.Path,
+        limit_parents: typing.Union[int, None] = None,
+    ) -> typing.Tuple[pathlib.Path, str]:
+        """
+        Search the root directory and reason without consulting the cache.
+        """
+        cacheable = self._is_cacheable()
+        for dir in self._search_dirs(start_path, limit_parents):
+            if cacheable and (self, dir) in self._negative_cache:
+                continue
+            # the reasons of failing directories are never reported, hence
+            # the description is only put together for the matching one
+            index = self.new_index(dir)
+            if self._search_test(dir, index):
+                success, reason = self._search_test_with_reason(dir, index)
+                if success:
+                    return pathlib.Path(dir), reason
+            self._add_to_negative_cache(dir)
 
         # todo: add criterion to error message
         raise FileNotFoundError(
-            f"No root directory found in {parents[0]} or its parent directories."
+            f"No root directory found in {start_path} or its parent directories."
         )
 
+    def _is_cacheable(self) -> bool:
+        """
+        Tests whether the search results may be cached, i.e. the criterion
+        isn't volatile and can be a cache key. E.g. a dataclass defining
+        ``__eq__`` isn't hashable.
+        """
+        if self.volatile:
+            return False
+        try:
+            hash(self)
+        except TypeError:
+            return False
+        return True
+
+    def _search_dirs(
+        self, start_path: pathlib.Path, limit_parents: typing.Union[int, None]
+    ) -> typing.Tuple[str, ...]:
+        return self.candidate_dirs(
+            _get_parent_dirs(os.fspath(start_path), limit_parents)
+        )
+
+    def _add_to_negative_cache(self, dir: str) -> None:
+        """
+        Remember that ``dir`` doesn't meet this criterion.
+        """
+        if not self._is_cacheable():
+            return
+        negative_cache = RootCriterion._negative_cache
+        if len(negative_cache) >= self._negative_cache_size:
+            # crude, but keeps the memory bounded
+            negative_cache.clear()
+        negative_cache.add((self, dir))
+
     def find_file(self, *args: PathSpec, **kwargs: typing.Any) -> pathlib.Path:
         """
         Construct a file's (or directory's) path relative to the project's root.
@@ -124,7 +658,7 @@ class RootCriterion(abc.ABC):
         Raises FileNotFoundError if no criteria were met.
         """
         # rprojroot checks that all but first components are relative
-        if any(pathlib.Path(arg).is_absolute() for arg in args[1:]):
+        if any(os.path.isabs(arg) for arg in args[1:]):
             raise ValueError("only first path component may be absolute")
         file_path = pathlib.Path(*args)
         if file_path.is_absolute():
@@ -142,7 +676,7 @@ class RootCriterion(abc.ABC):
         * if so, the returned path only uses the path components of args
         * otherwise root_dir is extended by the path components of args
         """
-        if any(pathlib.Path(arg).is_absolute() for arg in args[1:]):
+        if any(os.path.isabs(arg) for arg in args[1:]):
             raise ValueError("only first path component may be absolute")
         file_path = pathlib.Path(*args)
         if file_path.is_absolute():
@@ -169,35 +703,190 @@ class RootCriterion(abc.ABC):
         return fix_file_fn
 
     def find_root_with_reason(
-        self, *args: typing.Any, **kwargs: typing.Any
+        self,
+        path: PathSpec = ".",
+        limit_parents: typing.Union[int, None] = None,
+        resolve_path: bool = False,
     ) -> typing.Tuple[pathlib.Path, str]:
         """
         Return the root directory and the reason why it matches.
 
         All parameters are the same as for ``find_root``.
         """
-        parents = self.list_search_dirs(*args, **kwargs)
-        for dir in parents:
-            success, reason = self.test_with_reason(dir)
-            if success:
-                return dir, reason
-
-        # todo: add criterion to error message
-        raise FileNotFoundError(
-            f"No root directory found in {parents[0]} or its parent directories."
-        )
+        start_path = self.get_start_path(path, resolve_path)
+        if not self._is_cacheable():
+            return self._find_root_with_reason(start_path, limit_parents)
+        return _cached_find_root_with_reason(self, start_path, limit_parents)
 
     def __or__(self, other: "RootCriterion") -> "AnyCriteria":
         if isinstance(other, AnyCriteria):
-            return AnyCriteria(self, *other.criteria)
+            return AnyCriteria(*(self,) + other.criteria)
         return AnyCriteria(self, other)
 
     def __and__(self, other: "RootCriterion") -> "AllCriteria":
         if isinstance(other, AllCriteria):
-            return AllCriteria(self, *other.criteria)
+            return AllCriteria(*(self,) + other.criteria)
         return AllCriteria(self, other)
 
 
+def _overrides_public(cls: type, public: str, indexed: str) -> bool:
+    """
+    Tests whether ``cls`` overrides the method ``public`` below the class
+    implementing ``indexed``, e.g. ``test`` of a user's subclass of
+    ``HasFile``.
+    """
+    for klass in cls.__mro__:
+        if indexed in vars(klass):
+            return False
+        if public in vars(klass):
+            return True
+    return False
+
+
+@functools.lru_cache(maxsize=16)
+def _get_start_path(cwd: str, path: str, resolve_path: bool) -> pathlib.Path:
+    if resolve_path:
+        abspath = os.fspath(pathlib.Path(cwd, path).resolve())
+    else:
+        abspath = os.path.abspath(os.path.join(cwd, path))
+    try:
+        # one stat call tells existence and file type
+        is_dir = stat.S_ISDIR(os.stat(abspath).st_mode)
+    except (FileNotFoundError, NotADirectoryError):
+        raise FileNotFoundError(f"`{path}` does not exist.") from None
+    if not is_dir:
+        abspath = os.path.dirname(abspath)
+    # the only pathlib.Path created
+    return pathlib.Path(abspath)
+
+
+@functools.lru_cache(maxsize=128)
+def _get_parent_dirs(
+    start_dir: str, limit_parents: typing.Union[int, None]
+) -> typing.Tuple[str, ...]:
+    """
+    Like ``RootCriterion.iter_parents``, but the parents are strings.
+
+    The root search tests the directories as strings, only the directory
+    found is converted into a ``pathlib.Path``.
+    """
+    dirs = [start_dir]
+    parent = os.path.dirname(start_dir)
+    while parent != dirs[-1]:
+        dirs.append(parent)
+        parent = os.path.dirname(parent)
+    return (start_dir,) + tuple(dirs[1:][:limit_parents])
+
+
+# the root search results are cached per criterion and start path
+# failed searches raise and are therefore not cached
+@functools.lru_cache(maxsize=128)
+def _cached_find_root(
+    criterion: RootCriterion,
+    start_path: pathlib.Path,
+    limit_parents: typing.Union[int, None],
+    parallel: bool = False,
+) -> pathlib.Path:
+    return criterion._find_root(start_path, limit_parents, parallel)
+
+
+@functools.lru_cache(maxsize=128)
+def _cached_find_root_with_reason(
+    criterion: RootCriterion,
+    start_path: pathlib.Path,
+    limit_parents: typing.Union[int, None],
+) -> typing.Tuple[pathlib.Path, str]:
+    return criterion._find_root_with_reason(start_path, limit_parents)
+
+
+def _get_mtime(dir: str) -> typing.Optional[int]:
+    try:
+        return os.stat(dir).st_mtime_ns
+    except OSError:
+        return None
+
+
+# roots found by find_root_cached with the modification times of the
+# directories searched
+_mtime_cache: typing.Dict[
+    typing.Tuple[RootCriterion, pathlib.Path, typing.Union[int, None]],
+    typing.Tuple[
+        pathlib.Path, typing.Tuple[typing.Tuple[str, typing.Optional[int]], ...]
+    ],
+] = {}
+
+# directories not meeting a criterion with their modification times
+_mtime_negative_cache: typing.Dict[typing.Tuple[RootCriterion, str], int] = {}
+
+
+def clear_root_cache() -> None:
+    """
+    Forget all cached root directories and directories known not to meet
+    a criterion.
+
+    Call this after creating or removing files which might change the outcome
+    of the root search, e.g. after adding a ``.here`` file.
+    """
+    _get_start_path.cache_clear()
+    _cached_find_root.cache_clear()
+    _cached_find_root_with_reason.cache_clear()
+    _mtime_cache.clear()
+    _mtime_negative_cache.clear()
+    RootCriterion._negative_cache.clear()
+
+
+def _flatten(
+    kind: typing.Type[RootCriterion], criteria: typing.Iterable[RootCriterion]
+) -> typing.Tuple[RootCriterion, ...]:
+    """
+    Expand the criteria combined by the same ``kind``, e.g. ``AnyCriteria``
+    nested in ``AnyCriteria``. These are flat already.
+    """
+    flat: typing.List[RootCriterion] = []
+    for c in criteria:
+        if type(c) is kind and isinstance(c, (AnyCriteria, AllCriteria)):
+            flat.extend(c.criteria)
+        else:
+            flat.append(c)
+    return tuple(flat)
+
+
+def _keeps_position(c: RootCriterion) -> bool:
+    """
+    Tests whether ``c`` is - or contains - a criterion of unknown behaviour,
+    e.g. a user's test function, which must not be reordered.
+    """
+    if c.volatile or c._public_test or c._public_test_with_reason:
+        return True
+    if isinstance(c, (AnyCriteria, AllCriteria)):
+        return any(_keeps_position(child) for child in c.criteria)
+    return False
+
+
+def _cheap_first(
+    criteria: typing.Sequence[RootCriterion],
+    key: typing.Callable[[RootCriterion], typing.Any],
+) -> typing.List[int]:
+    """
+    The indices of ``criteria`` in the order to test them, sorted by ``key``.
+
+    Only the runs of this package's criteria are sorted. The others keep
+    their position, as the criteria before them might guard them, e.g.
+    ``HasFile("DESCRIPTION") & CriterionFromTestFun(parse_description)``.
+    """
+    order: typing.List[int] = []
+    run: typing.List[int] = []
+    for i, c in enumerate(criteria):
+        if _keeps_position(c):
+            order.extend(sorted(run, key=lambda j: key(criteria[j])))
+            order.append(i)
+            run = []
+        else:
+            run.append(i)
+    order.extend(sorted(run, key=lambda j: key(criteria[j])))
+    return order
+
+
 class AnyCriteria(RootCriterion):
     """
     The directory matches when at least one of the criteria is met.
@@ -205,20 +894,98 @@ class AnyCriteria(RootCriterion):
     Criteria can be linked together with ``|`` to form ``AnyCriteria``.
     """
 
+    __slots__ = ("criteria", "cost", "volatile", "_test_criteria", "_description")
+
     def __init__(self, *criteria: RootCriterion):
-        self.criteria = criteria
+        self.criteria = _flatten(AnyCriteria, criteria)
+        self.cost = sum(c.cost for c in self.criteria)
+        self.volatile = any(c.volatile for c in self.criteria)
+        self._description: typing.Optional[str] = None
+        # test the cheap criteria first, the name checks fused together,
+        # a criterion nested several times is tested once
+        # (by identity, criteria needn't be hashable)
+        unique = tuple({id(c): c for c in self.criteria}.values())
+        self._test_criteria = self.fuse_name_checks(
+            [
+                unique[i]
+                for i in _cheap_first(
+                    unique, lambda c: (c.cost, c.name_check() is None)
+                )
+            ]
+        )
         super().__init__()
 
+    @staticmethod
+    def fuse_name_checks(
+        criteria: typing.Sequence[RootCriterion],
+    ) -> typing.Tuple[RootCriterion, ...]:
+        """
+        Replace consecutive plain name checks by a ``FusedNameCriteria``.
+        """
+        fused: typing.List[RootCriterion] = []
+        name_checks: typing.List[RootCriterion] = []
+        for c in (*criteria, None):
+            if c is not None and c.name_check() is not None:
+                name_checks.append(c)
+                continue
+            if len(name_checks) > 1:
+                fused.append(FusedNameCriteria(*name_checks))
+            else:
+                fused.extend(name_checks)
+            name_checks = []
+            if c is not None:
+                fused.append(c)
+        return tuple(fused)
+
     def describe(self) -> str:
-        return " or ".join(c.describe() for c in self.criteria)
+        # the criteria don't change, the description is put together once
+        if self._description is None:
+            self._description = " or ".join(c.describe() for c in self.criteria)
+        return self._description
 
-    def test(self, dir: PathSpec) -> bool:
-        return any(c.test(dir) for c in self.criteria)
+    def _test_indexed(self, dir: PathSpec, index: typing.Optional[DirIndex]) -> bool:
+        if index is None:
+            index = DirIndex(dir)
+        # a plain loop, no generator per tested directory
+        for c in self._test_criteria:
+            if c._search_test(dir, index):
+                return True
+        return False
 
-    def test_with_reason(self, dir: PathSpec) -> typing.Tuple[bool, str]:
+    def compile_test(self) -> TestFun:
+        tests = tuple(c.compile_test() for c in self._test_criteria)
+        if len(tests) == 1:
+            return tests[0]
+
+        def test(dir: PathSpec, index: typing.Optional[DirIndex] = None) -> bool:
+            for c_test in tests:
+                if c_test(dir, index):
+                    return True
+            return False
+
+        return test
+
+    def entries_only(self) -> bool:
+        return all(c.entries_only() for c in self.criteria)
+
+    def candidate_dirs(self, dirs: typing.Tuple[str, ...]) -> typing.Tuple[str, ...]:
+        # the union, any criterion not narrowing the search keeps all
+        candidates: typing.Set[str] = set()
+        for c in self.criteria:
+            c_dirs = c.candidate_dirs(dirs)
+            if c_dirs is dirs:
+                return dirs
+            candidates.update(c_dirs)
+        return tuple(dir for dir in dirs if dir in candidates)
+
+    def _test_with_reason_indexed(
+        self, dir: PathSpec, index: typing.Optional[DirIndex]
+    ) -> typing.Tuple[bool, str]:
+        if index is None:
+            index = DirIndex(dir)
         all_reasons = []
         for c in self.criteria:
-            c_met, reason = c.test_with_reason(dir)
+            c_met, reason = c._search_test_with_reason(dir, index)
             if c_met:
                 return True, reason
             all_reasons.append(reason)
@@ -226,8 +993,52 @@ class AnyCriteria(RootCriterion):
 
     def __or__(self, other: RootCriterion) -> "AnyCriteria":
         if isinstance(other, AnyCriteria):
-            return AnyCriteria(*self.criteria, *other.criteria)
-        return AnyCriteria(*self.criteria, other)
+            return AnyCriteria(*self.criteria + other.criteria)
+        return AnyCriteria(*self.criteria + (other,))
+
+
+class FusedNameCriteria(AnyCriteria):
+    """
+    The directory matches when at least one of the name checks is met.
+
+    ``AnyCriteria`` uses it for consecutive criteria testing plain entry
+    names, e.g. ``HasFile("setup.py") | HasDir(".git")``. The test is a set
+    intersection with the directory's listing instead of one lookup per
+    criterion.
+    """
+
+    __slots__ = ("name_checks",)
+
+    def __init__(self, *criteria: RootCriterion):
+        # bypass AnyCriteria.__init__, these criteria are fused already
+        self.criteria = tuple(criteria)
+        self.cost = 1
+        self.volatile = False
+        self._description = None
+        self._test_criteria = criteria
+        self.name_checks: typing.Dict[str, typing.List[str]] = {}
+        for c in criteria:
+            name_check = c.name_check()
+            assert name_check is not None
+            method, name = name_check
+            self.name_checks.setdefault(sys.intern(name), []).append(method)
+
+    def _test_indexed(self, dir: PathSpec, index: typing.Optional[DirIndex]) -> bool:
+        if index is None:
+            index = DirIndex(dir)
+        entries = index.entries
+        if entries is None:
+            return super()._test_indexed(dir, index)
+        for name in self.name_checks.keys() & entries.keys():
+            if any(getattr(index, method)(name) for method in self.name_checks[name]):
+                return True
+        if not _EXACT_NAMES:
+            # the names not listed are stat'ed
+            return super()._test_indexed(dir, index)
+        return False
+
+    def compile_test(self) -> TestFun:
+        return self._test_indexed
 
 
 class AllCriteria(RootCriterion):
@@ -237,11 +1048,29 @@ class AllCriteria(RootCriterion):
     Criteria can be linked together with ``&`` to form ``AllCriteria``.
     """
 
+    __slots__ = (
+        "criteria",
+        "cost",
+        "volatile",
+        "_test_order",
+        "_test_criteria",
+        "_description",
+    )
+
     def __init__(self, *criteria: RootCriterion):
-        self.criteria = criteria
+        self.criteria = _flatten(AllCriteria, criteria)
+        # test the cheap criteria first, all must be met anyway
+        self._test_order = tuple(_cheap_first(self.criteria, lambda c: c.cost))
+        # the indices keep the reasons in order, the tests iterate the tuple
+        self._test_criteria = tuple(self.criteria[i] for i in self._test_order)
+        self.cost = sum(c.cost for c in self.criteria)
+        self.volatile = any(c.volatile for c in self.criteria)
+        self._description: typing.Optional[str] = None
         super().__init__()
 
     def describe(self) -> str:
+        if self._description is not None:
+            return self._description
         descriptions = []
         for c in self.criteria:
             c_description = c.describe()
@@ -249,25 +1078,58 @@ class AllCriteria(RootCriterion):
                 # make sure the nested "or" clauses stay together
                 c_description = f"({c_description})"
             descriptions.append(c_description)
-        return " and ".join(descriptions)
+        self._description = " and ".join(descriptions)
+        return self._description
 
-    def test(self, dir: PathSpec) -> bool:
-        return all(c.test(dir) for c in self.criteria)
+    def _test_indexed(self, dir: PathSpec, index: typing.Optional[DirIndex]) -> bool:
+        if index is None:
+            index = DirIndex(dir)
+        for c in self._test_criteria:
+            if not c._search_test(dir, index):
+                return False
+        return True
 
-    def test_with_reason(self, dir: PathSpec) -> typing.Tuple[bool, str]:
-        reasons: typing.List[str] = []
+    def compile_test(self) -> TestFun:
+        tests = tuple(c.compile_test() for c in self._test_criteria)
+        if len(tests) == 1:
+            return tests[0]
+
+        def test(dir: PathSpec, index: typing.Optional[DirIndex] = None) -> bool:
+            for c_test in tests:
+                if not c_test(dir, index):
+                    return False
+            return True
+
+        return test
+
+    def entries_only(self) -> bool:
+        return all(c.entries_only() for c in self.criteria)
+
+    def candidate_dirs(self, dirs: typing.Tuple[str, ...]) -> typing.Tuple[str, ...]:
+        # the intersection, every criterion narrows the search further
         for c in self.criteria:
-            c_met, reason = c.test_with_reason(dir)
+            dirs = c.candidate_dirs(dirs)
+        return dirs
+
+    def _test_with_reason_indexed(
+        self, dir: PathSpec, index: typing.Optional[DirIndex]
+    ) -> typing.Tuple[bool, str]:
+        if index is None:
+            index = DirIndex(dir)
+        reasons = [""] * len(self.criteria)
+        for i in self._test_order:
+            c_met, reason = self.criteria[i]._search_test_with_reason(dir, index)
             if not c_met:
                 return False, reason
-            reasons.append(reason)
+            reasons[i] = reason
 
+        # report the reasons in the order the criteria were given
         return True, " and ".join(reasons)
 
     def __and__(self, other: RootCriterion) -> "AllCriteria":
         if isinstance(other, AllCriteria):
-            return AllCriteria(*self.criteria, *other.criteria)
-        return AllCriteria(*self.criteria, other)
+            return AllCriteria(*self.criteria + other.criteria)
+        return AllCriteria(*self.criteria + (other,))
 
 
 class CriterionFromTestFun(RootCriterion):
@@ -275,6 +1137,8 @@ class CriterionFromTestFun(RootCriterion):
     Create a criterion by providing a test function and optional description.
     """
 
+    __slots__ = ("testfun", "description", "cost")
+
     def __init__(
         self,
         testfun: typing.Callable[[PathSpec], bool],
@@ -283,6 +1147,7 @@ class CriterionFromTestFun(RootCriterion):
         # todo: check whether testfun has one path argument
         assert callable(testfun)
         self.testfun = testfun
+        self.cost = RootCriterion.cost
         if description is None:
             self.description = f"Test Function `{testfun.__name__}`"
         else:
@@ -293,4 +1158,5 @@ class CriterionFromTestFun(RootCriterion):
         return self.description
 
     def test(self, dir: PathSpec) -> bool:
-        return self.testfun(dir)
+        # test functions get the directory as ``pathlib.Path``
+        return self.testfun(as_path(dir))
@@ -1,13 +1,207 @@
+import codecs
+import fnmatch
+import functools
 import itertools
+import locale
+import mmap
+import os
 import pathlib
 import re
+import sys
 import typing
 
-from .core_criteria import AnyCriteria, CriterionFromTestFun, PathSpec, RootCriterion
+from .core_criteria import (
+    AnyCriteria,
+    CriterionFromTestFun,
+    DirIndex,
+    PathSpec,
+    RootCriterion,
+    as_path,
+)
 
 # todo: for this and below: check for relative paths in criterion args
 
 
+def _is_single_level_glob(pattern: str) -> bool:
+    """
+    Tests whether the glob pattern only matches entries of the directory.
+    """
+    return DirIndex.is_plain_name(pattern) and "**" not in pattern
+
+
+# ASCII regular expressions of literal characters and anchors match the
+# same lines of an utf-8 encoded file as bytes patterns
+_LITERAL_PATTERN = re.compile(r"\^?[^\\.^$*+?{}\[\]|()]*\$?")
+
+# the items of a regular expression: escapes, character classes, repetitions
+# and single characters
+_REGEXP_ITEM = re.compile(
+    r"\\.|\[\^?\]?(?:\\.|[^\\\]])*\]|\{\d*(?:,\d*)?\}|.", re.DOTALL
+)
+
+
+# escapes continuing after the escaped character
+_MULTI_CHARACTER_ESCAPES = frozenset("xuUN0123456789")
+
+
+def _required_literal(pattern: str) -> typing.Optional[str]:
+    """
+    The longest literal string contained in every match of the regular
+    expression.
+
+    None if there is none or the expression is too complex to tell, e.g. it
+    has groups or alternatives.
+    """
+    if "|" in pattern or "(" in pattern:
+        return None
+    literals = [""]
+    for item in _REGEXP_ITEM.findall(pattern):
+        if item[0] == "\\" and item[1:2] in _MULTI_CHARACTER_ESCAPES:
+            # e.g. ``\x41``, ``\N{DIGIT ONE}``, ``\012`` or a group reference,
+            # the item is only the escape's first character
+            return None
+        if item in ("*", "?") or item.startswith("{") and len(item) > 1:
+            # the preceding character is optional
+            literals[-1] = literals[-1][:-1]
+            literals.append("")
+        elif len(item) > 1 or item in ".^$+\\[]{}":
+            literals.append("")
+        else:
+            literals[-1] += item
+    return max(literals, key=len) or None
+
+
+def _is_line_local(pattern: str) -> bool:
+    """
+    Tests whether the regular expression can't match a line break, i.e. it
+    finds the same lines in the joined text with ``re.MULTILINE``.
+    """
+    if "(?" in pattern or "\n" in pattern:
+        # flags, lookarounds, ...
+        return False
+    for item in _REGEXP_ITEM.findall(pattern):
+        if item.startswith("["):
+            # negated classes, escapes like ``\s`` and ranges from control
+            # characters match line breaks
+            if item.startswith("[^") or "\\" in item or min(item) < " ":
+                return False
+        elif item.startswith("\\") and item[1].isalnum() and item[1] not in "bdSw":
+            # e.g. ``\s``, ``\W``, ``\A``, ``\Z``, ``\012``, also ``\B``, which
+            # matches between the line breaks around an empty line
+            return False
+    return True
+
+
+# glob patterns match case-insensitively where ``os.path.normcase`` folds case
+_CASE_SENSITIVE = os.path.normcase("A") == "A"
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_glob(pattern: str) -> typing.Pattern[str]:
+    """
+    The regular expression of the glob pattern, shared by equal patterns.
+    """
+    return re.compile(fnmatch.translate(os.path.normcase(pattern)))
+
+
+def _glob_name_matcher(
+    regexp: typing.Pattern[str],
+) -> typing.Callable[[str], typing.Optional[typing.Match[str]]]:
+    """
+    The function matching a plain entry name against a translated glob.
+    """
+    if _CASE_SENSITIVE:
+        return regexp.match
+    return lambda name: regexp.match(os.path.normcase(name))
+
+
+def _is_utf8_locale() -> bool:
+    """
+    Tests whether text files are opened as utf-8 by default.
+    """
+    return codecs.lookup(locale.getpreferredencoding(False)).name == "utf-8"
+
+
+_shared_instances: typing.Dict[typing.Tuple[type, str], typing.Any] = {}
+
+
+def _shared_instance(cls: type, name: PathSpec) -> typing.Any:
+    """
+    One instance per name criterion class and (interned) name.
+    """
+    key = (cls, _intern(name))
+    instance = _shared_instances.get(key)
+    if instance is None:
+        if len(_shared_instances) >= 256:
+            # crude, but keeps the memory bounded
+            _shared_instances.clear()
+        instance = _shared_instances[key] = cls(key[1])
+    return instance
+
+
+def _read_binary(file: PathSpec, newlines: int = -1) -> bytes:
+    """
+    Read the file unbuffered, stop after ``newlines`` line feeds unless
+    negative.
+    """
+    fd = os.open(file, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        chunks = []
+        count = 0
+        while True:
+            chunk = os.read(fd, 65536 if newlines < 0 else 4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            if newlines >= 0:
+                count += chunk.count(b"\n")
+                if count >= newlines:
+                    break
+    finally:
+        os.close(fd)
+    return b"".join(chunks)
+
+
+def _is_line_content(line: bytes) -> bool:
+    """
+    Tests whether ``line`` is a non-empty line without line breaks.
+    """
+    return bool(line) and b"\r" not in line and b"\n" not in line
+
+
+def _has_line(data: bytes, line: bytes) -> bool:
+    """
+    Tests whether one of the lines in ``data`` is equal to ``line``, the lines
+    split the same way as by ``bytes.splitlines``.
+    """
+    if not _is_line_content(line):
+        return line in data.splitlines()
+    return _find_line(data, line)
+
+
+def _find_line(data: typing.Union[bytes, mmap.mmap], line: bytes) -> bool:
+    """
+    Finds the non-empty ``line`` between line breaks in ``data``.
+    """
+    start = data.find(line)
+    while start >= 0:
+        end = start + len(line)
+        if (start == 0 or data[start - 1] in b"\r\n") and (
+            end == len(data) or data[end] in b"\r\n"
+        ):
+            return True
+        start = data.find(line, start + 1)
+    return False
+
+
+def _intern(name: PathSpec) -> str:
+    """
+    Interns the names as strings, equal names of criteria share one string
+    object and the tests don't need to convert paths.
+    """
+    return sys.intern(os.fspath(name))
+
+
 class HasFile(RootCriterion):
     """
     Matches if the named file is present, optionally the file's contents
@@ -21,6 +215,24 @@ class HasFile(RootCriterion):
               of the line (i.e. use the anchors ``^``, ``$`` for start and end).
     """
 
+    __slots__ = (
+        "filename",
+        "contents",
+        "fixed",
+        "max_lines_to_search",
+        "cost",
+        "_contents_regexp",
+        "_contents_literal",
+        "_contents_regexp_text",
+        "_contents_bytes",
+        "_contents_regexp_bytes",
+    )
+
+    volatile = False
+
+    # files larger than this are scanned for a fixed string before reading
+    mmap_min_size = 4096
+
     def __init__(
         self,
         filename: PathSpec,
@@ -28,10 +240,31 @@ class HasFile(RootCriterion):
         n: int = -1,
         fixed: bool = False,
     ):
-        self.filename = filename
+        self.filename = _intern(filename)
         self.contents = contents
         self.fixed = bool(fixed)
         self.max_lines_to_search = int(n)
+        self._contents_regexp: typing.Optional[typing.Pattern[str]] = None
+        self._contents_literal: typing.Optional[str] = None
+        self._contents_regexp_text: typing.Optional[typing.Pattern[str]] = None
+        self._contents_bytes: typing.Optional[bytes] = None
+        self._contents_regexp_bytes: typing.Optional[typing.Pattern[bytes]] = None
+        self.cost = 1
+        if contents is not None:
+            # reading the file is way more expensive than a stat call
+            self.cost = 10
+            if not self.fixed:
+                self._contents_regexp = re.compile(contents)
+                self._contents_literal = _required_literal(contents)
+                if _is_line_local(contents):
+                    # searches all lines at once
+                    self._contents_regexp_text = re.compile(contents, re.MULTILINE)
+                if contents.isascii() and _LITERAL_PATTERN.fullmatch(contents):
+                    self._contents_regexp_bytes = re.compile(
+                        contents.encode(), re.MULTILINE
+                    )
+            else:
+                self._contents_bytes = contents.encode("utf-8", "surrogateescape")
         super().__init__()
 
     @staticmethod
@@ -41,12 +274,98 @@ class HasFile(RootCriterion):
         newline character at the end.
         """
         with open(file, "rt") as txt_file:
-            yield from (line.rstrip("\n") for line in txt_file)
+            text = txt_file.read()
+        yield from HasFile.split_lines(text)
 
-    def check_file_contents(self, file: PathSpec) -> bool:
+    @staticmethod
+    def split_lines(text: str) -> typing.List[str]:
+        """
+        Split the text read in text mode (i.e. with universal newlines) into
+        lines without the newline character.
+        """
+        lines = text.split("\n")
+        # text ends with a newline or is empty
+        if not lines[-1]:
+            lines.pop()
+        return lines
+
+    def name_check(self) -> typing.Optional[typing.Tuple[str, str]]:
+        if type(self) is not HasFile or self.contents is not None:
+            return None
+        if not DirIndex.is_plain_name(self.filename):
+            return None
+        return "is_file", self.filename
+
+    def read_lines_to_search(self, file: PathSpec) -> typing.List[str]:
+        """
+        Read the lines to search from the text file with a single read and
+        returns them without the newline character at the end.
+        """
+        with open(file, "rt") as txt_file:
+            if self.max_lines_to_search < 0:
+                text = txt_file.read()
+            else:
+                text = "".join(itertools.islice(txt_file, self.max_lines_to_search))
+        return self.split_lines(text)
+
+    def search_mapped_file(self, file: PathSpec) -> typing.Optional[bool]:
+        """
+        Search a large file in a memory map, which is much cheaper than
+        reading and splitting it into lines.
+
+        Applies to fixed strings and literal patterns searched in the whole
+        file, the result is None if the memory map can't tell, e.g. for small
+        files or lines ending in ``\\r``.
+        """
+        if self.max_lines_to_search >= 0 or not _is_utf8_locale():
+            return None
+        contents_bytes = self._contents_bytes
+        regexp_bytes = self._contents_regexp_bytes
+        if contents_bytes is None and regexp_bytes is None:
+            return None
+        try:
+            size = os.stat(file).st_size
+        except OSError:
+            # reading the file reports the error
+            return None
+        if size <= self.mmap_min_size:
+            return None
+        with open(file, "rb") as bin_file:
+            with mmap.mmap(bin_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                if contents_bytes is not None:
+                    # the utf-8 encoded string is in the file if a line is
+                    # equal to it
+                    if buffer.find(contents_bytes) < 0:
+                        return False
+                    if not _is_line_content(contents_bytes):
+                        return None
+                    return _find_line(buffer, contents_bytes)
+                if regexp_bytes is None or buffer.find(b"\r") >= 0:
+                    return None
+                # the last line break doesn't start another line
+                end = size - 1 if buffer[size - 1] == ord("\n") else size
+                return regexp_bytes.search(buffer, 0, end) is not None
+
+    def read_binary_lines_to_search(self, file: PathSpec) -> typing.List[bytes]:
+        """
+        Read the lines to search in binary mode and split them the same way
+        as the universal newlines of text mode do.
+        """
+        if self.max_lines_to_search < 0:
+            return _read_binary(file).splitlines()
+        # each b"\n" ends at least one line, lone b"\r" can end more
+        data = _read_binary(file, self.max_lines_to_search)
+        return data.splitlines()[: self.max_lines_to_search]
+
+    def check_file_contents(
+        self, file: PathSpec, index: typing.Optional[DirIndex] = None
+    ) -> bool:
         """
         Check whether in the contents of the file meets the line match
         criterion.
+
+        The lines read are shared with other criteria testing the same
+        ``index``.
         """
         # early returns have the side effect that the read permission for the
         # file is not checked.
@@ -55,27 +374,66 @@ class HasFile(RootCriterion):
         if self.max_lines_to_search == 0:
             return False
 
-        line_iterator = self.read_lines_from_file(file)
-
-        if self.max_lines_to_search >= 0:
-            line_iterator = itertools.islice(
-                line_iterator,
-                self.max_lines_to_search,
+        has_bytes_contents = (
+            self._contents_bytes is not None or self._contents_regexp_bytes is not None
+        )
+        if has_bytes_contents and _is_utf8_locale():
+            # match fixed strings and literal patterns without decoding
+            mode = ("b", self.max_lines_to_search)
+            if index is None or not index.is_read(file, mode):
+                found = self.search_mapped_file(file)
+                if found is not None:
+                    return found
+            contents_bytes = self._contents_bytes
+            regexp_bytes = self._contents_regexp_bytes
+            if self.max_lines_to_search < 0:
+                # whole files are searched in the buffer read, not line by line
+                if index is None:
+                    data = _read_binary(file)
+                else:
+                    data = index.read_file(file, mode, _read_binary)
+                if contents_bytes is not None:
+                    return _has_line(data, contents_bytes)
+                if not data:
+                    return False
+                if regexp_bytes is not None and b"\r" not in data:
+                    # the last line break doesn't start another line
+                    end = len(data) - 1 if data.endswith(b"\n") else len(data)
+                    return regexp_bytes.search(data, 0, end) is not None
+                binary_lines = data.splitlines()
+            elif index is None:
+                binary_lines = self.read_binary_lines_to_search(file)
+            else:
+                binary_lines = index.read_file(
+                    file, mode, self.read_binary_lines_to_search
+                )
+            if regexp_bytes is None:
+                return contents_bytes in binary_lines
+            # literal patterns are line local, one search covers all lines
+            return bool(binary_lines) and (
+                regexp_bytes.search(b"\n".join(binary_lines)) is not None
             )
 
-        if self.fixed:
-            fixed_pattern = self.contents
-
-            def match_function(line: str) -> bool:
-                return fixed_pattern == line
-
+        if index is None:
+            lines = self.read_lines_to_search(file)
         else:
-            regexp_pattern = re.compile(self.contents)
-
-            def match_function(line: str) -> bool:
-                return regexp_pattern.search(line) is not None
+            lines = index.read_file(
+                file, self.max_lines_to_search, self.read_lines_to_search
+            )
 
-        return any((match_function(line) for line in line_iterator))
+        # let the iteration over the lines happen in C
+        if self._contents_regexp is None:
+            return self.contents in lines
+        if not lines:
+            return False
+        text = "\n".join(lines)
+        literal = self._contents_literal
+        if literal is not None and literal not in text:
+            # no line can match without the literal
+            return False
+        if self._contents_regexp_text is not None:
+            return self._contents_regexp_text.search(text) is not None
+        return any(map(self._contents_regexp.search, lines))
 
     def describe_contents_matching(self) -> str:
         if self.contents is None:
@@ -93,9 +451,20 @@ class HasFile(RootCriterion):
 
         return description
 
-    def test(self, dir: PathSpec) -> bool:
-        full_filename = pathlib.Path(dir) / self.filename
-        return full_filename.is_file() and self.check_file_contents(full_filename)
+    def _test_indexed(self, dir: PathSpec, index: typing.Optional[DirIndex]) -> bool:
+        if index is None:
+            index = DirIndex(dir, scan=False)
+        if self.contents is None:
+            return index.is_file(self.filename)
+        if not index.is_file(self.filename):
+            return False
+        if DirIndex.is_plain_name(self.filename):
+            return self.check_file_contents(os.path.join(dir, self.filename), index)
+        # let pathlib normalise e.g. ``a/./b.txt``
+        return self.check_file_contents(as_path(dir) / self.filename, index)
+
+    def entries_only(self) -> bool:
+        return self.contents is None and DirIndex.is_plain_name(self.filename)
 
     def describe(self) -> str:
         pattern_description = f"has a file `{self.filename}`"
@@ -111,6 +480,8 @@ class HasFilePattern(HasFile):
     Limitation: Searches only for entries at the same directory level
     """
 
+    __slots__ = ("_name_regexp",)
+
     def __init__(
         self,
         pattern: str,
@@ -118,24 +489,24 @@ class HasFilePattern(HasFile):
         n: int = -1,
         fixed: bool = False,
     ):
-        self.contents = contents
-        self.fixed = bool(fixed)
-        self.max_lines_to_search = int(n)
-        super().__init__(pattern)
-
-    def test(self, dir: PathSpec) -> bool:
-        pattern = re.compile(str(self.filename))
-        for full_filename in pathlib.Path(dir).iterdir():
-            if (
-                full_filename.is_file()
-                and pattern.search(full_filename.name)
-                and self.check_file_contents(full_filename)
-            ):
+        super().__init__(pattern, contents, n, fixed)
+        # the listing comes on top of the file's stat
+        self.cost = max(self.cost, 4)
+        self._name_regexp = re.compile(str(pattern))
+
+    def _test_indexed(self, dir: PathSpec, index: typing.Optional[DirIndex]) -> bool:
+        if index is None:
+            index = DirIndex(dir)
+        for full_filename in index.iter_files(self._name_regexp.search):
+            if self.check_file_contents(full_filename, index):
                 return True
         return False
 
     # todo: test_with_reason should print matching filename
 
+    def entries_only(self) -> bool:
+        return self.contents is None
+
     def describe(self) -> str:
         pattern_description = (
             f"has a file matching the regular expression `{self.filename}`"
@@ -152,6 +523,8 @@ class HasFileGlob(HasFile):
     The glob pattern allows searching in subdirectories.
     """
 
+    __slots__ = ("_is_single_level", "_match_name")
+
     def __init__(
         self,
         pattern: str,
@@ -159,19 +532,31 @@ class HasFileGlob(HasFile):
         n: int = -1,
         fixed: bool = False,
     ):
-        self.contents = contents
-        self.fixed = bool(fixed)
-        self.max_lines_to_search = int(n)
-        super().__init__(pattern)
+        super().__init__(pattern, contents, n, fixed)
+        self.cost = max(self.cost, 3)
+        # patterns without subdirectories are matched against the listing
+        self._is_single_level = _is_single_level_glob(pattern)
+        self._match_name = _glob_name_matcher(_compile_glob(pattern))
+
+    def _test_indexed(self, dir: PathSpec, index: typing.Optional[DirIndex]) -> bool:
+        if not self._is_single_level:
+            for full_filename in as_path(dir).glob(self.filename):
+                if full_filename.is_file() and self.check_file_contents(full_filename):
+                    return True
+            return False
 
-    def test(self, dir: PathSpec) -> bool:
-        for full_filename in pathlib.Path(dir).glob(str(self.filename)):
-            if full_filename.is_file() and self.check_file_contents(full_filename):
+        if index is None:
+            index = DirIndex(dir)
+        for full_filename in index.iter_files(self._match_name):
+            if self.check_file_contents(full_filename, index):
                 return True
         return False
 
     # todo: test_with_reason should print matching filename
 
+    def entries_only(self) -> bool:
+        return self._is_single_level and self.contents is None
+
     def describe(self) -> str:
         pattern_description = f"has a file matching `{self.filename}`"
         if self.contents is not None:
@@ -184,12 +569,37 @@ class HasDir(RootCriterion):
     Match if a directory of the given name is present.
     """
 
+    __slots__ = ("dirname",)
+
+    cost = 1
+    volatile = False
+
     def __init__(self, dirname: PathSpec):
-        self.dirname = dirname
+        self.dirname = _intern(dirname)
         super().__init__()
 
-    def test(self, dir: PathSpec) -> bool:
-        return (pathlib.Path(dir) / self.dirname).is_dir()
+    @classmethod
+    def get(cls, dirname: PathSpec) -> "HasDir":
+        """
+        The shared criterion for ``dirname``, criteria got for the same name
+        are one object, e.g. tested once in an ``AnyCriteria`` holding it
+        several times. The search results are cached per top-level
+        criterion, the combinations don't share them.
+        """
+        return typing.cast(HasDir, _shared_instance(cls, dirname))
+
+    def _test_indexed(self, dir: PathSpec, index: typing.Optional[DirIndex]) -> bool:
+        if index is None:
+            index = DirIndex(dir, scan=False)
+        return index.is_dir(self.dirname)
+
+    def name_check(self) -> typing.Optional[typing.Tuple[str, str]]:
+        if self._public_test or not DirIndex.is_plain_name(self.dirname):
+            return None
+        return "is_dir", self.dirname
+
+    def entries_only(self) -> bool:
+        return DirIndex.is_plain_name(self.dirname)
 
     def describe(self) -> str:
         return f"contains the directory `{self.dirname}`"
@@ -206,12 +616,34 @@ class HasEntry(RootCriterion):
     ``pathlib.Path.joinpath``. Consider using ``HasDir`` instead.
     """
 
+    __slots__ = ("entryname",)
+
+    cost = 1
+    volatile = False
+
     def __init__(self, entryname: PathSpec):
-        self.entryname = entryname
+        self.entryname = _intern(entryname)
         super().__init__()
 
-    def test(self, dir: PathSpec) -> bool:
-        return (pathlib.Path(dir) / self.entryname).exists()
+    @classmethod
+    def get(cls, entryname: PathSpec) -> "HasEntry":
+        """
+        The shared criterion for ``entryname``, see ``HasDir.get``.
+        """
+        return typing.cast(HasEntry, _shared_instance(cls, entryname))
+
+    def _test_indexed(self, dir: PathSpec, index: typing.Optional[DirIndex]) -> bool:
+        if index is None:
+            index = DirIndex(dir, scan=False)
+        return index.exists(self.entryname)
+
+    def name_check(self) -> typing.Optional[typing.Tuple[str, str]]:
+        if self._public_test or not DirIndex.is_plain_name(self.entryname):
+            return None
+        return "exists", self.entryname
+
+    def entries_only(self) -> bool:
+        return DirIndex.is_plain_name(self.entryname)
 
     def describe(self) -> str:
         return f"contains the entry `{self.entryname}`"
@@ -224,20 +656,43 @@ class HasEntryGlob(RootCriterion):
     The glob pattern allows searching in subdirectories.
     """
 
+    __slots__ = ("pattern", "_is_single_level", "_is_literal", "_match_name")
+
+    cost = 3
+    volatile = False
+
     def __init__(
         self,
         pattern: str,
     ):
         self.pattern = pattern
+        # patterns without subdirectories are matched against the listing
+        self._is_single_level = _is_single_level_glob(pattern)
+        # pathlib only yields existing entries for literal names
+        self._is_literal = not any(c in pattern for c in "*?[")
+        self._match_name = _glob_name_matcher(_compile_glob(pattern))
         super().__init__()
 
-    def test(self, dir: PathSpec) -> bool:
-        for _ in pathlib.Path(dir).glob(self.pattern):
+    def _test_indexed(self, dir: PathSpec, index: typing.Optional[DirIndex]) -> bool:
+        if self._is_single_level:
+            if index is None:
+                index = DirIndex(dir)
+            entries = index.entries
+            if entries is not None:
+                if self._is_literal:
+                    return index.exists(self.pattern)
+                # filter the names in C, stop at the first match
+                return next(filter(self._match_name, entries), None) is not None
+
+        for _ in as_path(dir).glob(self.pattern):
             return True
         return False
 
     # TODO test with reason could actually print the entry found
 
+    def entries_only(self) -> bool:
+        return self._is_single_level
+
     def describe(self) -> str:
         return f"has a file matching `{self.pattern}`"
 
@@ -250,13 +705,32 @@ class HasBasename(RootCriterion):
     The directory's basename is equal to the name specified.
     """
 
+    __slots__ = ("basename",)
+
+    cost = 0
+    volatile = False
+
     def __init__(self, basename: PathSpec):
-        self.basename = basename
+        self.basename = _intern(basename)
         super().__init__()
 
-    def test(self, dir: PathSpec) -> bool:
+    def _test_indexed(self, dir: PathSpec, index: typing.Optional[DirIndex]) -> bool:
+        if isinstance(dir, str):
+            # the root search tests normalised directory strings, pathlib
+            # only differs for trailing separators or ``.``
+            name = os.path.basename(dir)
+            if name not in ("", "."):
+                return self.basename == name
         return self.basename == pathlib.Path(dir).name
 
+    def candidate_dirs(self, dirs: typing.Tuple[str, ...]) -> typing.Tuple[str, ...]:
+        # decided by the path alone, no directory is touched
+        return tuple(dir for dir in dirs if self.test(dir))
+
+    def entries_only(self) -> bool:
+        # decided by the path alone
+        return True
+
     def describe(self) -> str:
         return f"has the basename `{self.basename}`"
 
@@ -265,10 +739,32 @@ class IsCwd(RootCriterion):
     """
     Directory is the current directory while searching
     for the project root.
+
+    Directories are compared by device and inode number, the current
+    directory is only stat'ed again after a change of directory.
     """
 
-    def test(self, dir: PathSpec) -> bool:
-        return pathlib.Path.cwd().resolve() == pathlib.Path(dir).resolve()
+    __slots__ = ("_cwd", "_cwd_id")
+
+    cost = 1
+    volatile = True
+
+    def __init__(self) -> None:
+        self._cwd: typing.Optional[str] = None
+        self._cwd_id: typing.Tuple[int, int] = (-1, -1)
+
+    def _test_indexed(self, dir: PathSpec, index: typing.Optional[DirIndex]) -> bool:
+        cwd = os.getcwd()
+        if os.fspath(dir) == cwd:
+            return True
+        if cwd != self._cwd:
+            cwd_stat = os.stat(cwd)
+            self._cwd, self._cwd_id = cwd, (cwd_stat.st_dev, cwd_stat.st_ino)
+        try:
+            dir_stat = os.stat(dir)
+        except OSError:
+            return False
+        return (dir_stat.st_dev, dir_stat.st_ino) == self._cwd_id
 
     def describe(self) -> str:
         return "is the current working directory"
@@ -277,16 +773,60 @@ class IsCwd(RootCriterion):
 def as_root_criterion(criterion: typing.Any) -> "RootCriterion":
     """
     Converts its input into a Criterion.
+
+    Strings, paths and tuples are converted once, the same input gives the
+    same criterion, which shares the cached root search results. These
+    include the directories failing it, see ``clear_root_cache``.
     """
+    if isinstance(criterion, RootCriterion):
+        return criterion
+    if isinstance(criterion, (str, pathlib.Path, tuple)):
+        try:
+            return _cached_root_criterion(criterion)
+        except TypeError:
+            # unhashable, e.g. a tuple holding a list
+            pass
+    return _to_root_criterion(criterion)
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_root_criterion(criterion: typing.Hashable) -> "RootCriterion":
+    return _to_root_criterion(criterion)
+
+
+def _to_root_criterion(criterion: typing.Any) -> "RootCriterion":
     # take anything and try to make a criterion out of it
+    if type(criterion) is str:
+        # the most common case, e.g. lists of marker file names
+        return HasFile(criterion)
     if isinstance(criterion, RootCriterion):
         return criterion
     if isinstance(criterion, (str, pathlib.Path)):
         return HasFile(criterion)
     if callable(criterion):
         return CriterionFromTestFun(criterion)
-    if isinstance(criterion, dict):
-        return AnyCriteria(*map(as_root_criterion, criterion.values()))
-    if isinstance(criterion, (list, tuple)):
-        return AnyCriteria(*map(as_root_criterion, criterion))
+    if isinstance(criterion, (dict, list, tuple)):
+        # nested collections are collected into one AnyCriteria, without
+        # creating (and flattening) one per nesting level
+        criteria: typing.List[RootCriterion] = []
+        stack = [iter(_collection_items(criterion))]
+        while stack:
+            for item in stack[-1]:
+                if isinstance(item, (dict, list, tuple)):
+                    stack.append(iter(_collection_items(item)))
+                    break
+                criteria.append(as_root_criterion(item))
+            else:
+                stack.pop()
+        return AnyCriteria(*criteria)
     raise ValueError(f"can not convert {type(criterion)} to criterion")
+
+
+def _collection_items(
+    criteria: typing.Union[
+        typing.Dict[typing.Any, typing.Any], typing.Sequence[typing.Any]
+    ],
+) -> typing.Iterable[typing.Any]:
+    if isinstance(criteria, dict):
+        return criteria.values()
+    return criteria
@@ -1,13 +1,32 @@
 # this is explicitly providing the 0.2.0 version's interface of pyprojroot
-# and marked deprecated
+# and marked deprecated, the warning is issued when it's used first
 
+import functools
+import typing
 import warnings
 
-from .pyprojroot_0_2_0 import here, py_project_root
+from . import pyprojroot_0_2_0
 
 __all__ = ["here", "py_project_root"]
 
-warnings.warn(
-    "Importing legacy module `pyprojroot2.pyprojroot`.",
-    DeprecationWarning,
-)
+F = typing.TypeVar("F", bound=typing.Callable[..., typing.Any])
+
+
+def _deprecated(fun: F) -> F:
+    @functools.wraps(fun)
+    def wrapper(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+        # the filters of ``warnings`` decide whether to show it again
+        warnings.warn(
+            "Using legacy module `pyprojroot2.pyprojroot`.",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        # later calls through this module go to the function directly
+        globals()[fun.__name__] = fun
+        return fun(*args, **kwargs)
+
+    return typing.cast(F, wrapper)
+
+
+here = _deprecated(pyprojroot_0_2_0.here)
+py_project_root = _deprecated(pyprojroot_0_2_0.py_project_root)
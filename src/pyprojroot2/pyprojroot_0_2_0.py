@@ -1,9 +1,10 @@
+import os
 import pathlib
 import typing
 import warnings
 
 from .core_criteria import PathSpec
-from .generic_criteria import as_root_criterion
+from .generic_criteria import _to_root_criterion
 from .predefined_criteria import py_here_criteria
 
 
@@ -17,7 +18,9 @@ def py_project_root(
     if project_files is None:
         root_criterion = py_here_criteria
     else:
-        root_criterion = as_root_criterion(project_files)
+        # a new criterion for every call, like version 0.2.0 searched afresh:
+        # the memoized one would remember the directories failing before
+        root_criterion = _to_root_criterion(project_files)
     return root_criterion.find_root(path)
 
 
@@ -28,6 +31,6 @@ def here(
 ) -> pathlib.Path:
     root = py_project_root(path=".", project_files=project_files)
     project_entry = root.joinpath(relative_project_path)
-    if warn and not project_entry.exists():
+    if warn and not os.path.lexists(project_entry):
         warnings.warn(f"Path doesn't exist: {project_entry}")
     return project_entry
@@ -1,7 +1,7 @@
 import pathlib
 import typing
 
-from .core_criteria import RootCriterion, PathSpec
+from .core_criteria import RootCriterion, PathSpec, clear_root_cache
 from .predefined_criteria import py_here_criteria
 from .generic_criteria import HasFile, as_root_criterion
 
@@ -19,10 +19,13 @@ _rhere_root_criterion: RootCriterion = py_here_criteria
 
 
 # https://github.com/r-lib/here/blob/970dd2726c5cddda4a0e44e910fe5290be063485/R/here.R#L33
-# TODO: this actually uses a cached version of the root path
 def here(*args: typing.Any, **kwargs: typing.Any) -> pathlib.Path:
     """
     Find a file relative to the project's root.
+
+    Like r's ``here`` the root is only searched once per current directory,
+    later calls use the cached result. ``clear_root_cache`` forces a new
+    search.
     """
     return _rhere_root_criterion.find_file(*args, **kwargs)
 
@@ -46,6 +49,9 @@ def set_root_crit(criterion: RootCriterion) -> None:
     """
     global _rhere_root_criterion
     _rhere_root_criterion = as_root_criterion(criterion)
+    # the same criterion might have been searched before, e.g. a marker file
+    # name, and the project structure might have changed since
+    clear_root_cache()
 
 
 # https://github.com/r-lib/here/blob/970dd2726c5cddda4a0e44e910fe5290be063485/R/set_here.R#L25
@@ -54,6 +60,8 @@ def set_here(path: PathSpec = ".") -> None:
     # add warning if alread exists...
     # and there's a verbose mode...
     (pathlib.Path(path) / ".here").touch()
+    # the new marker might change the outcome of previous searches
+    clear_root_cache()
 
 
 # https://github.com/r-lib/here/blob/970dd2726c5cddda4a0e44e910fe5290be063485/R/i_am.R#L44
@@ -70,8 +78,12 @@ def i_am(
 
     If successful this criterion is set as a new root criterion.
 
+    The root caches are cleared, so a marker file created after a failed
+    call is found.
+
     Raises FileNotFoundError if no root was found.
     """
+    global _rhere_root_criterion
     root_criterion: RootCriterion
     if uuid is not None:
         root_criterion = HasFile(
@@ -80,6 +92,7 @@ def i_am(
     else:
         # this will use HasFile for any string/path
         root_criterion = as_root_criterion(path_or_criterion)
+    clear_root_cache()
     root_path = root_criterion.find_root()
-    set_root_crit(root_criterion)
+    _rhere_root_criterion = root_criterion
     return root_path
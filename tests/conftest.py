@@ -0,0 +1,13 @@
+import typing
+
+import pytest
+
+from pyprojroot2 import clear_root_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_root_cache() -> typing.Iterator[None]:
+    # the root search caches are global, don't let tests interfere
+    clear_root_cache()
+    yield
+    clear_root_cache()
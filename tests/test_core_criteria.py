@@ -1,17 +1,35 @@
 # root criterion features under test
 
+import dataclasses
+import os
 import pathlib
+import typing
 
 import pytest
 
+from pyprojroot2 import core_criteria
 from pyprojroot2.core_criteria import (
     AllCriteria,
     AnyCriteria,
     CriterionFromTestFun,
+    DirIndex,
     PathSpec,
     RootCriterion,
+    _get_parent_dirs,
+    clear_root_cache,
 )
-from pyprojroot2.generic_criteria import HasEntry
+from pyprojroot2.generic_criteria import HasBasename, HasDir, HasEntry, HasFile
+
+
+def test_root_criterion_base(tmp_path: pathlib.Path) -> None:
+    with pytest.raises(NotImplementedError):
+        RootCriterion().test(tmp_path)
+    assert RootCriterion().describe() == "RootCriterion"
+
+    # the package's criteria don't carry an instance dictionary
+    combined = (HasEntry("a") | HasFile("b", "c")) & HasEntry("d")
+    assert not hasattr(combined, "__dict__")
+    assert not any(hasattr(c, "__dict__") for c in combined.criteria)
 
 
 def test_get_start_path(tmp_path: pathlib.Path) -> None:
@@ -49,6 +67,12 @@ def test_list_search_dirs(tmp_path: pathlib.Path) -> None:
     )
     assert search_dirs == [nested_dirs]  # only current dir
 
+    # the root search walks the same directories as strings
+    for limit_parents in (None, 0, 2, -1, -2, -len(all_search_dirs) - 2):
+        assert [
+            pathlib.Path(d) for d in _get_parent_dirs(str(nested_dirs), limit_parents)
+        ] == RootCriterion.list_search_dirs(nested_dirs, limit_parents)
+
 
 def test_make_fix_file(tmp_path: pathlib.Path) -> None:
     nested_dirs = tmp_path / "a/b/c/d/e/f"
@@ -178,5 +202,406 @@ def test_testfun_criterion(tmp_path: pathlib.Path) -> None:
     rproj_test = CriterionFromTestFun(test_rproj_fun)
     assert rproj_test.describe() == "Test Function `test_rproj_fun`"
 
+    # the search hands a pathlib.Path to the test function
+    path_test = CriterionFromTestFun(lambda dir: (dir / "rrrr.Rproj").is_file())
+    assert path_test.find_root(tmp_path / "rrrr") == tmp_path / "rrrr"
+
     with pytest.raises(AssertionError):
         CriterionFromTestFun(fun_description)  # type: ignore[arg-type]
+
+
+def test_public_test_protocol(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "a/b").mkdir(parents=True)
+    (tmp_path / "marker").touch()
+
+    class HasMarker(RootCriterion):
+        # written against the public one argument protocol
+        def test(self, dir: PathSpec) -> bool:
+            return (pathlib.Path(dir) / "marker").exists()
+
+    start = tmp_path / "a/b"
+    assert HasMarker().find_root(start) == tmp_path
+    assert (HasMarker() | HasFile("x")).find_root(start) == tmp_path
+    assert (HasMarker() & HasEntry("a")).find_root(start) == tmp_path
+    assert (HasMarker() | HasFile("x")).find_root_with_reason(start) == (
+        tmp_path,
+        "HasMarker",
+    )
+
+    class OnlyA(HasEntry):
+        # overrides a package criterion, the search must call it
+        def test(self, dir: PathSpec) -> bool:
+            return super().test(dir) and pathlib.Path(dir).name == "a"
+
+        def test_with_reason(self, dir: PathSpec) -> typing.Tuple[bool, str]:
+            return self.test(dir), "only a"
+
+    only_b = OnlyA("b")
+    assert only_b.name_check() is None
+    assert only_b.find_root(start) == tmp_path / "a"
+    assert (only_b | HasEntry("x")).find_root(start) == tmp_path / "a"
+    assert (only_b | HasEntry("x")).find_root_with_reason(start) == (
+        tmp_path / "a",
+        "only a",
+    )
+
+    with pytest.raises(NotImplementedError):
+        RootCriterion().test(tmp_path)
+
+
+def test_root_cache(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "marker").touch()
+    (tmp_path / "a").mkdir()
+
+    root = HasEntry("marker")
+    assert root.find_root(tmp_path / "a") == tmp_path
+    assert root.find_root_with_reason(tmp_path / "a") == (
+        tmp_path,
+        "contains the entry `marker`",
+    )
+
+    # the cached result survives removing the marker
+    (tmp_path / "marker").unlink()
+    assert root.find_root(tmp_path / "a") == tmp_path
+
+    clear_root_cache()
+    with pytest.raises(FileNotFoundError):
+        root.find_root(tmp_path / "a")
+    with pytest.raises(FileNotFoundError):
+        root.find_root_with_reason(tmp_path / "a")
+
+
+def test_parallel_find_root(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "marker").touch()
+    (tmp_path / "a/marker").mkdir(parents=True)
+    (tmp_path / "a/b/c").mkdir(parents=True)
+
+    root = HasEntry("marker")
+    start = tmp_path / "a/b/c"
+    assert root.find_root(start, parallel=True) == tmp_path / "a"
+    assert root.find_root(start, parallel=True) == root.find_root(start)
+    assert HasFile("marker").find_root(start, parallel=True) == tmp_path
+    with pytest.raises(FileNotFoundError):
+        HasFile("marker").find_root(start, limit_parents=1, parallel=True)
+
+
+def test_compile_test(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").touch()
+
+    criteria = [
+        HasEntry("a") & HasFile("b"),
+        HasEntry("a") & HasFile("c"),
+        (HasEntry("x") & HasFile("b")) | HasEntry("y"),
+        HasEntry("x") | (HasEntry("a") & HasFile("b")),
+        AnyCriteria(HasFile("b")),
+    ]
+    for criterion in criteria:
+        compiled_test = criterion.compile_test()
+        for dir in (tmp_path, tmp_path / "a"):
+            assert compiled_test(dir, DirIndex(dir)) == criterion.test(dir)
+
+
+def test_new_index(tmp_path: pathlib.Path) -> None:
+    # a single name is stat'ed, the listing is shared by combined criteria
+    assert not HasFile("a").new_index(tmp_path).scan
+    assert (HasFile("a") | HasEntry("b")).new_index(tmp_path).scan
+    assert HasFile("a", "contents").new_index(tmp_path).scan
+
+
+def test_dir_index(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "my_file").touch()
+    (tmp_path / "a/b").mkdir(parents=True)
+    (tmp_path / "a/b/c.txt").touch()
+
+    for index in (DirIndex(tmp_path), DirIndex(tmp_path, scan=False)):
+        assert index.is_file("my_file")
+        assert not index.is_dir("my_file")
+        assert index.is_dir("a")
+        assert not index.is_file("a")
+        assert index.exists("a")
+        assert not index.exists("b")
+        # subpaths are not in the index
+        assert index.is_file("a/b/c.txt")
+        assert index.is_dir("a/b")
+        assert index.exists(".")
+
+    index = DirIndex(tmp_path)
+    assert index.entries is not None
+    assert sorted(index.entries) == ["a", "my_file"]
+    assert [f.name for f in index.iter_files()] == ["my_file"]
+    assert list(index.iter_files(lambda name: name.startswith("a"))) == []
+    assert DirIndex(tmp_path, scan=False).entries is None
+    assert [
+        f.name for f in DirIndex(tmp_path, scan=False).iter_files(str.isalpha)
+    ] == []
+    assert [
+        f.name for f in DirIndex(tmp_path, scan=False).iter_files(lambda n: "_" in n)
+    ] == ["my_file"]
+
+    # a name is stat'ed once
+    (tmp_path / "x").mkdir()
+    index = DirIndex(tmp_path, scan=False)
+    assert index.is_dir("x")
+    (tmp_path / "x").rmdir()
+    assert index.exists("x") and not index.is_file("x")
+
+    # files are read once per mode
+    reads = []
+
+    def read(file: PathSpec) -> str:
+        reads.append(file)
+        return pathlib.Path(file).read_text()
+
+    (tmp_path / "my_file").write_text("contents")
+    index = DirIndex(tmp_path)
+    assert index.read_file(tmp_path / "my_file", "t", read) == "contents"
+    assert index.read_file(str(tmp_path / "my_file"), "t", read) == "contents"
+    assert len(reads) == 1
+    index.read_file(tmp_path / "my_file", "other", read)
+    assert len(reads) == 2
+
+
+def test_dir_index_inexact_names(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # the names not listed are stat'ed where the file system may know them
+    # by another spelling, e.g. a different case on Windows
+    index = DirIndex(tmp_path)
+    assert index.entries == {}
+    (tmp_path / "late").touch()
+    assert not index.is_file("late")
+
+    monkeypatch.setattr(core_criteria, "_EXACT_NAMES", False)
+    index = DirIndex(tmp_path)
+    assert index.entries is not None
+    (tmp_path / "later").touch()
+    assert index.is_file("later")
+    assert index.exists("later")
+    assert not index.is_dir("later")
+    fused = HasFile("x") | HasEntry("y")
+    index = DirIndex(tmp_path)
+    assert index.entries is not None
+    (tmp_path / "x").touch()
+    assert fused.compile_test()(tmp_path, index)
+
+
+def test_negative_cache(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "a/b").mkdir(parents=True)
+
+    root = HasEntry("marker")
+    with pytest.raises(FileNotFoundError):
+        root.find_root(tmp_path / "a/b")
+    assert (root, str(tmp_path / "a")) in RootCriterion._negative_cache
+
+    # the sibling search doesn't notice the new marker in the cached parent
+    (tmp_path / "a/marker").touch()
+    (tmp_path / "a/c").mkdir()
+    with pytest.raises(FileNotFoundError):
+        root.find_root(tmp_path / "a/c")
+
+    clear_root_cache()
+    assert root.find_root(tmp_path / "a/c") == tmp_path / "a"
+
+
+def test_candidate_dirs(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "proj/src/proj").mkdir(parents=True)
+    (tmp_path / "proj/marker").touch()
+    dirs = _get_parent_dirs(str(tmp_path / "proj/src/proj"), None)
+
+    assert HasFile("marker").candidate_dirs(dirs) is dirs
+    named = (str(tmp_path / "proj/src/proj"), str(tmp_path / "proj"))
+    assert HasBasename("proj").candidate_dirs(dirs) == named
+    assert (HasBasename("proj") & HasFile("marker")).candidate_dirs(dirs) == named
+    assert (HasBasename("proj") | HasFile("marker")).candidate_dirs(dirs) is dirs
+    assert (HasBasename("src") | HasBasename("proj")).candidate_dirs(dirs) == (
+        named[0],
+        str(tmp_path / "proj/src"),
+        named[1],
+    )
+
+    # the directories not named "proj" aren't tested at all
+    tested = []
+    root = HasBasename("proj") & CriterionFromTestFun(
+        lambda dir: tested.append(dir) or (dir / "marker").exists()
+    )
+    assert root.find_root(tmp_path / "proj/src/proj") == tmp_path / "proj"
+    assert tested == [tmp_path / "proj/src/proj", tmp_path / "proj"]
+
+
+def test_volatile_criteria(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    (tmp_path / "a/b").mkdir(parents=True)
+
+    # user test functions may depend on more than the file system
+    is_cwd = CriterionFromTestFun(lambda dir: dir == pathlib.Path.cwd())
+    assert is_cwd.volatile
+    monkeypatch.chdir(tmp_path / "a")
+    assert is_cwd.find_root(tmp_path / "a/b") == tmp_path / "a"
+    monkeypatch.chdir(tmp_path / "a/b")
+    assert is_cwd.find_root(".") == tmp_path / "a/b"
+    assert is_cwd.find_root_cached(".") == tmp_path / "a/b"
+    assert not RootCriterion._negative_cache
+
+    assert not HasFile("x").volatile
+    assert (HasFile("x") | is_cwd).volatile
+
+    class MyEntry(HasEntry):
+        def test(self, dir: PathSpec) -> bool:
+            return super().test(dir)
+
+    assert MyEntry("x").volatile
+
+
+def test_unhashable_criterion(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "a").mkdir()
+    (tmp_path / "marker").touch()
+
+    @dataclasses.dataclass
+    class HasMarker(RootCriterion):
+        # defines __eq__, hence isn't hashable
+        name: str
+        volatile = False
+
+        def test(self, dir: PathSpec) -> bool:
+            return (pathlib.Path(dir) / self.name).exists()
+
+    criterion = HasMarker("marker")
+    with pytest.raises(TypeError):
+        hash(criterion)
+    assert criterion.find_root(tmp_path / "a") == tmp_path
+    assert criterion.find_root(tmp_path / "a", parallel=True) == tmp_path
+    assert criterion.find_root_cached(tmp_path / "a") == tmp_path
+    assert criterion.find_root_with_reason(tmp_path / "a")[0] == tmp_path
+    with pytest.raises(FileNotFoundError):
+        HasMarker("x").find_root(tmp_path / "a")
+
+    combined = HasMarker("b") | HasFile("x") | HasMarker("marker")
+    assert len(combined._test_criteria) == 3
+    assert combined.find_root(tmp_path / "a") == tmp_path
+    assert (criterion & HasEntry("a")).find_root(tmp_path / "a") == tmp_path
+
+
+def test_find_root_cached(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "a/b").mkdir(parents=True)
+    (tmp_path / "marker").touch()
+
+    root = HasEntry("marker")
+    assert root.find_root_cached(tmp_path / "a/b") == tmp_path
+    assert root.find_root_cached(tmp_path / "a/b") is root.find_root_cached(
+        tmp_path / "a/b"
+    )
+
+    # a new entry in a searched directory changes its modification time
+    (tmp_path / "a/marker").touch()
+    os.utime(tmp_path / "a", ns=(0, 0))
+    assert root.find_root_cached(tmp_path / "a/b") == tmp_path / "a"
+
+    (tmp_path / "a/marker").unlink()
+    (tmp_path / "marker").unlink()
+    with pytest.raises(FileNotFoundError):
+        root.find_root_cached(tmp_path / "a/b")
+
+    # failed directories are skipped while unchanged, unlike find_root the
+    # sibling search notices the new marker in a failed parent
+    (tmp_path / "a/c").mkdir()
+    with pytest.raises(FileNotFoundError):
+        root.find_root_cached(tmp_path / "a/c")
+    (tmp_path / "a/marker").touch()
+    os.utime(tmp_path / "a", ns=(1, 1))
+    assert root.find_root_cached(tmp_path / "a/c") == tmp_path / "a"
+
+
+def test_find_root_cached_beyond_entries(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "a/.vscode").mkdir(parents=True)
+    (tmp_path / "a/DESCRIPTION").write_text("Title: a\n")
+
+    assert HasEntry("x").entries_only()
+    assert (HasEntry("x") | HasDir("y")).entries_only()
+    criteria = (
+        HasFile(".vscode/settings.json"),
+        HasFile("DESCRIPTION", "^Package: "),
+    )
+    for criterion in criteria:
+        assert not criterion.entries_only()
+        assert not (criterion | HasEntry("x")).entries_only()
+        with pytest.raises(FileNotFoundError):
+            criterion.find_root_cached(tmp_path / "a", limit_parents=0)
+
+    # the failed directory's modification time doesn't change
+    mtime = os.stat(tmp_path / "a").st_mtime_ns
+    (tmp_path / "a/.vscode/settings.json").touch()
+    (tmp_path / "a/DESCRIPTION").write_text("Package: a\n")
+    assert os.stat(tmp_path / "a").st_mtime_ns == mtime
+
+    for criterion in criteria:
+        assert criterion.find_root_cached(tmp_path / "a") == tmp_path / "a"
+
+
+def test_flat_criteria() -> None:
+    a, b, c, d = (HasEntry(name) for name in "abcd")
+    assert AnyCriteria(AnyCriteria(a, b), c, AnyCriteria(d)).criteria == (a, b, c, d)
+    assert (a | (b | c) | d).criteria == (a, b, c, d)
+    assert AllCriteria(AllCriteria(a, b), c, AllCriteria(d)).criteria == (a, b, c, d)
+    # different kinds stay nested
+    assert AllCriteria(AnyCriteria(a, b), c).criteria[0].criteria == (a, b)
+    assert AllCriteria(AnyCriteria(a, b), c).describe() == (
+        "(contains the entry `a` or contains the entry `b`) and contains the entry `c`"
+    )
+
+
+def test_all_criteria_order(tmp_path: pathlib.Path) -> None:
+    # the package's criteria are tested cheap first
+    contents = HasFile("DESCRIPTION", contents="^Package: ")
+    entry = HasEntry("DESCRIPTION")
+    combined = contents & entry
+    assert combined._test_criteria == (entry, contents)
+    assert combined.describe().endswith(" and contains the entry `DESCRIPTION`")
+    assert combined.describe() is combined.describe()
+    assert combined.cost == 11
+
+    tested = []
+
+    def make_criterion(name: str, cost: int, result: bool) -> RootCriterion:
+        def testfun(dir: PathSpec) -> bool:
+            tested.append(name)
+            return result
+
+        criterion = CriterionFromTestFun(testfun, name)
+        criterion.cost = cost
+        return criterion
+
+    # test functions keep their position, the criteria before might guard them
+    expensive = make_criterion("expensive", 10, True)
+    cheap = make_criterion("cheap", 1, False)
+    assert not (expensive & cheap).test(tmp_path)
+    assert tested == ["expensive", "cheap"]
+
+    def parse(dir: pathlib.Path) -> bool:
+        return (dir / "DESCRIPTION").read_text().startswith("Package: ")
+
+    guarded = contents & CriterionFromTestFun(parse)
+    (tmp_path / "DESCRIPTION").write_text("Package: test\n")
+    (tmp_path / "sub").mkdir()
+    assert guarded.find_root(tmp_path / "sub") == tmp_path
+    # as well as the ones met before
+    guarded = contents | CriterionFromTestFun(lambda d: parse(d / "sub"))
+    assert guarded.test(tmp_path)
+
+    # runs of the package's criteria between them are sorted
+    tested.clear()
+    combined = AllCriteria(contents, entry, cheap, contents, HasDir("sub"))
+    assert [c for c in combined._test_criteria] == [
+        entry,
+        contents,
+        cheap,
+        combined.criteria[4],
+        contents,
+    ]
+
+    # successful reasons keep the original order
+    tested.clear()
+    combined = expensive & make_criterion("cheap", 1, True)
+    assert combined.test_with_reason(tmp_path) == (True, "expensive and cheap")
+    assert tested == ["expensive", "cheap"]
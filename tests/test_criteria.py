@@ -1,23 +1,47 @@
+import copy
+import os
 import pathlib
+import pickle
+import re
+import typing
 
 import pytest
 
+from pyprojroot2.core_criteria import AnyCriteria, FusedNameCriteria
 from pyprojroot2.generic_criteria import (
     HasBasename,
     HasDir,
     HasEntry,
+    HasEntryGlob,
     HasFile,
     HasFileGlob,
     HasFilePattern,
     IsCwd,
+    _compile_glob,
+    _has_line,
+    _is_line_local,
+    _required_literal,
+    as_root_criterion,
 )
 
 
+def make_example_fs_structure(root: pathlib.Path) -> pathlib.Path:
+    (root / "a/b/c/").mkdir(parents=True)
+    (root / "my_file").write_text("a\nb\nc\nd\n")
+    return root
+
+
+@pytest.fixture(scope="session")
+def example_fs_structure(tmp_path_factory: pytest.TempPathFactory) -> pathlib.Path:
+    # created once, tests must not change it
+    return make_example_fs_structure(
+        tmp_path_factory.mktemp("example_fs", numbered=False)
+    )
+
+
 @pytest.fixture
-def example_fs_structure(tmp_path: pathlib.Path) -> pathlib.Path:
-    (tmp_path / "a/b/c/").mkdir(parents=True)
-    (tmp_path / "my_file").write_text("a\nb\nc\nd\n")
-    return tmp_path
+def writable_fs_structure(tmp_path: pathlib.Path) -> pathlib.Path:
+    return make_example_fs_structure(tmp_path)
 
 
 def test_has_file_criterion(example_fs_structure: pathlib.Path) -> None:
@@ -48,7 +72,7 @@ def test_has_file_criterion(example_fs_structure: pathlib.Path) -> None:
 
     my_file = HasFile("my_file").find_file("my_file", path=example_fs_structure)
     assert isinstance(my_file, pathlib.Path)
-    assert open(my_file).read() == "a\nb\nc\nd\n"
+    assert my_file.read_text() == "a\nb\nc\nd\n"
 
     with pytest.raises(ValueError):
         HasFile("my_file").find_file("my_file", "/absolute", path=example_fs_structure)
@@ -86,6 +110,160 @@ def test_has_file_criterion(example_fs_structure: pathlib.Path) -> None:
     )
 
 
+def test_has_file_line_endings(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "crlf").write_bytes(b"a\r\nb\r\n\r\nc")
+    (tmp_path / "empty").write_bytes(b"")
+
+    assert HasFile("crlf", "b", fixed=True).read_lines_to_search(tmp_path / "crlf") == [
+        "a",
+        "b",
+        "",
+        "c",
+    ]
+    assert HasFile("crlf", "b", n=2).read_lines_to_search(tmp_path / "crlf") == [
+        "a",
+        "b",
+    ]
+    assert HasFile("empty", "").read_lines_to_search(tmp_path / "empty") == []
+
+    assert HasFile("crlf", "b", fixed=True).test(tmp_path)
+    assert HasFile("crlf", "", fixed=True).test(tmp_path)
+    assert HasFile("crlf", "^c$").test(tmp_path)
+    assert not HasFile("crlf", "^c$", n=3).test(tmp_path)
+    assert not HasFile("empty", "", fixed=True).test(tmp_path)
+    assert not HasFile("empty", "").test(tmp_path)
+
+    for n in (-1, 1, 2, 3, 5):
+        text_lines = HasFile("crlf", "^b$", n=n).read_lines_to_search(tmp_path / "crlf")
+        binary_lines = HasFile("crlf", "^b$", n=n).read_binary_lines_to_search(
+            tmp_path / "crlf"
+        )
+        assert binary_lines == [line.encode() for line in text_lines]
+
+    (tmp_path / "cr").write_bytes(b"Name: x\rPackage: a\r")
+    assert HasFile("cr", "^Package: ").test(tmp_path)
+    assert HasFile("cr", "Name: x", fixed=True).test(tmp_path)
+    assert HasFile("cr", "^Name: .$").test(tmp_path)
+    assert not HasFile("cr", "^Name: $").test(tmp_path)
+    assert HasFile("cr", "^Package: ", n=2).test(tmp_path)
+    assert not HasFile("cr", "^Package: ", n=1).test(tmp_path)
+
+
+def test_has_file_shared_read(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    (tmp_path / "pyproject.toml").write_text("[project]\nname = 'a'\n")
+    opened = []
+    real_open, real_os_open = open, os.open
+
+    def counting_open(file: typing.Any, *args: typing.Any) -> typing.Any:
+        opened.append(file)
+        return real_open(file, *args)
+
+    def counting_os_open(file: typing.Any, *args: typing.Any) -> typing.Any:
+        opened.append(file)
+        return real_os_open(file, *args)
+
+    # text mode uses open, binary mode os.open
+    monkeypatch.setattr("builtins.open", counting_open)
+    monkeypatch.setattr("os.open", counting_os_open)
+    both = HasFile("pyproject.toml", "^name = ") & HasFile(
+        "pyproject.toml", "[project]", fixed=True
+    )
+    assert both.test(tmp_path)
+    assert len(opened) == 1
+
+
+def test_required_literal(tmp_path: pathlib.Path) -> None:
+    for pattern, literal in [
+        ("^Package: ", "Package: "),
+        (r"^name\s*=", "name"),
+        ("ab*c", "a"),
+        ("ab+c", "ab"),
+        ("colou?r", "colo"),
+        ("a{0,2}bcd", "bcd"),
+        ("[]ab]cd", "cd"),
+        (r"\d+", None),
+        ("x|yyy", None),
+        ("(?i)abc", None),
+        (r"\x41", None),
+        (r"V\x65rsion", None),
+        (r"\u0041bc", None),
+        (r"\U00000041bc", None),
+        (r"\N{DIGIT ONE}", None),
+        (r"a\012bc", None),
+        (r"(a)\1bc", None),
+        (r"\\x41", "x41"),
+        (r"\.txt", "txt"),
+    ]:
+        assert _required_literal(pattern) == literal
+
+    (tmp_path / "setup.cfg").write_text("[metadata]\nname   = a\n")
+    assert HasFile("setup.cfg", r"^name\s*=").test(tmp_path)
+    assert not HasFile("setup.cfg", r"^version\s*=").test(tmp_path)
+    # the literal is found, but no line matches
+    assert not HasFile("setup.cfg", r"^\s+name").test(tmp_path)
+
+    # multi character escapes aren't taken for literals
+    (tmp_path / "proj.Rproj").write_text("Version: 1.0\n")
+    assert HasFile("proj.Rproj", r"^V\x65rsion: 1").test(tmp_path)
+    assert HasFile("proj.Rproj", r"^\N{LATIN CAPITAL LETTER V}ersion").test(tmp_path)
+
+
+def test_line_local_search(tmp_path: pathlib.Path) -> None:
+    assert _is_line_local(r"^\d+\.\d+ [a-z]*$")
+    for pattern in (r"a\sb", "[^a]b", r"[\s]", r"\Aa", r"\012", "(?s)a.b", r"\B"):
+        assert not _is_line_local(pattern)
+
+    # one search over all lines finds the same as searching line by line
+    lines = ["[project]", "", "name = 'a'", "version = 1.0", "", "end"]
+    (tmp_path / "a.toml").write_bytes("\r\n".join(lines).encode())
+    for pattern in ("^$", "^name", "1.0$", "^end$", "t$", "^version.*'a'", "e.*n"):
+        expected = any(re.search(pattern, line) for line in lines)
+        assert HasFile("a.toml", pattern).test(tmp_path) == expected, pattern
+        assert HasFile("a.toml", pattern, n=3).test(tmp_path) == any(
+            re.search(pattern, line) for line in lines[:3]
+        )
+
+    # ``\B`` doesn't match an empty line, but around it in the joined text
+    (tmp_path / "b.txt").write_text("\nx\n")
+    assert not HasFile("b.txt", r"\B").test(tmp_path)
+
+
+def test_has_line() -> None:
+    # all short texts of line breaks and two characters
+    texts = [b""]
+    for _ in range(5):
+        texts += [text + c for text in texts for c in (b"a", b"b", b"\r", b"\n")]
+    for text in set(texts):
+        for line in (b"a", b"ab", b"", b"a\r"):
+            assert _has_line(text, line) == (line in text.splitlines()), (text, line)
+
+
+def test_has_file_large_file(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "large").write_text("x" * 10000 + "\nneedle\n" + "y" * 10000)
+
+    assert HasFile("large", "needle", fixed=True).test(tmp_path)
+    assert HasFile("large", "needle").test(tmp_path)
+    assert not HasFile("large", "needles", fixed=True).test(tmp_path)
+    assert not HasFile("large", "eedle", fixed=True).test(tmp_path)
+    assert not HasFile("large", "needle", n=1, fixed=True).test(tmp_path)
+    # the second line starts after the first read chunk
+    assert HasFile("large", "needle", n=2, fixed=True).test(tmp_path)
+    assert HasFile("large", "^needle$", n=2).test(tmp_path)
+
+    # searched in a memory map, also with windows line endings
+    for newline in ("\n", "\r\n"):
+        (tmp_path / "large").write_bytes(
+            newline.join(["x" * 10000, "needle", "y" * 10000, ""]).encode()
+        )
+        assert HasFile("large", "^needle$").test(tmp_path)
+        assert not HasFile("large", "^eedle").test(tmp_path)
+        assert not HasFile("large", "^$").test(tmp_path)
+        assert HasFile("large", "needle", fixed=True).test(tmp_path)
+        assert not HasFile("large", "eedle", fixed=True).test(tmp_path)
+
+
 def test_current_dir(
     monkeypatch: pytest.MonkeyPatch, example_fs_structure: pathlib.Path
 ) -> None:
@@ -95,6 +273,15 @@ def test_current_dir(
         example_fs_structure / "a" / "b" / "c"
     )
 
+    # the same criterion follows a change of directory
+    is_cwd = IsCwd()
+    start = example_fs_structure / "a" / "b" / "c"
+    assert is_cwd.find_root(start) == example_fs_structure
+    monkeypatch.chdir(example_fs_structure / "a")
+    assert not is_cwd.test(example_fs_structure)
+    assert is_cwd.find_root(start) == example_fs_structure / "a"
+    assert (is_cwd | HasDir("nowhere")).find_root(start) == example_fs_structure / "a"
+
 
 def test_had_dir(example_fs_structure: pathlib.Path) -> None:
     assert HasDir("a").test(example_fs_structure)
@@ -129,20 +316,151 @@ def test_has_entry(example_fs_structure: pathlib.Path) -> None:
     )
 
 
+def test_shared_name_criteria() -> None:
+    # name criteria got for equal names are one object
+    assert HasEntry.get(".git") is HasEntry.get(".git")
+    assert HasDir.get(".git") is HasDir.get(pathlib.Path(".git"))
+    assert HasDir.get(".git") is not HasEntry.get(".git")
+    assert HasDir.get(".git").dirname == ".git"
+    # created ones are independent
+    assert HasDir(".git") is not HasDir(".git")
+    assert HasDir(".git") is not HasDir.get(".git")
+    # and a criterion nested several times is tested once
+    a = HasEntry("a")
+    assert len((a | a)._test_criteria) == 1
+
+    duplicate = copy.copy(HasEntry.get(".git"))
+    assert duplicate is not HasEntry.get(".git")
+    assert duplicate.entryname == ".git"
+    assert pickle.loads(pickle.dumps(HasDir.get(".git"))).dirname == ".git"
+
+    # subclasses may have other constructor arguments
+    class MyDir(HasDir):
+        def __init__(self, dirname: str, extra: int):
+            super().__init__(dirname)
+            self.extra = extra
+
+    assert MyDir("a", 1).dirname == "a"
+
+    # names are kept as interned strings
+    assert HasFile(pathlib.Path("setup.py")).filename is HasFile("setup.py").filename
+
+
+def test_as_root_criterion_cached() -> None:
+    # hashable specs are converted once
+    assert as_root_criterion("setup.py") is as_root_criterion("setup.py")
+    assert as_root_criterion(("a", "b")) is as_root_criterion(("a", "b"))
+    assert as_root_criterion(("a", "b")).criteria[0] is as_root_criterion("a")
+    # others are converted every time
+    assert as_root_criterion(["a"]) is not as_root_criterion(["a"])
+    assert isinstance(as_root_criterion(("a", ["b"])), AnyCriteria)
+    with pytest.raises(ValueError):
+        as_root_criterion((1,))
+
+
+def test_as_root_criterion_nested() -> None:
+    criterion = as_root_criterion({"a": ["a", ("b", {"c": "c"})], "d": [[]], "e": "e"})
+    assert type(criterion) is AnyCriteria
+    assert [c.filename for c in criterion.criteria] == ["a", "b", "c", "e"]
+    git = HasDir(".git")
+    assert as_root_criterion([[git]]).criteria == (git,)
+
+
 def test_has_basename(example_fs_structure: pathlib.Path) -> None:
     assert HasBasename("a").test(example_fs_structure / "a")
     assert not HasBasename("a").test(example_fs_structure)
     assert HasBasename(example_fs_structure.name).test(example_fs_structure)
+    # strings behave like paths
+    for dir in ("x/a", "x/a/", "x/a/.", "a"):
+        assert HasBasename("a").test(dir)
+    assert not HasBasename("a").test("a/..")
 
 
-def test_pattern_filenames(example_fs_structure: pathlib.Path) -> None:
-    assert HasFileGlob("my_*").test(example_fs_structure)
-    assert HasFilePattern("_fil").test(example_fs_structure)
-    assert not HasFilePattern("^_fil").test(example_fs_structure)
-    assert not HasFilePattern("[ab]").test(example_fs_structure)
+def test_pattern_filenames(writable_fs_structure: pathlib.Path) -> None:
+    assert HasFileGlob("my_*").test(writable_fs_structure)
+    assert HasFileGlob("my_fil?").test(writable_fs_structure)
+    assert not HasFileGlob("a*").test(writable_fs_structure)  # a directory
+    assert not HasFileGlob("my_").test(writable_fs_structure)
+    (writable_fs_structure / "a/b/c/d.txt").touch()
+    assert HasFileGlob("a/*/c/*.txt").test(writable_fs_structure)
+    assert not HasFileGlob("a/*/*.txt").test(writable_fs_structure)
+    assert HasFilePattern("_fil").test(writable_fs_structure)
+    assert not HasFilePattern("^_fil").test(writable_fs_structure)
+    assert not HasFilePattern("[ab]").test(writable_fs_structure)
+
+    # contents are checked as well
+    assert HasFilePattern("_fil", "^c$").test(writable_fs_structure)
+    assert not HasFilePattern("_fil", "^c$", n=2).test(writable_fs_structure)
+    assert HasFileGlob("my_*", "d", fixed=True).test(writable_fs_structure)
+    assert not HasFileGlob("my_*", "e", fixed=True).test(writable_fs_structure)
 
     assert HasFileGlob("my_*").describe() == "has a file matching `my_*`"
     assert (
         HasFilePattern("_fil").describe()
         == "has a file matching the regular expression `_fil`"
     )
+
+
+def test_has_entry_glob(writable_fs_structure: pathlib.Path) -> None:
+    (writable_fs_structure / "broken").symlink_to("nowhere")
+
+    for pattern, expected in [
+        ("my_*", True),
+        ("a", True),
+        ("[ab]", True),
+        ("*.txt", False),
+        ("broken", False),
+        ("bro*", True),
+        ("a/b", True),
+        ("a/*/c", True),
+        ("**/c", True),
+        ("a/x*", False),
+    ]:
+        assert HasEntryGlob(pattern).test(writable_fs_structure) == expected
+        assert any(writable_fs_structure.glob(pattern)) == expected
+
+    # equal patterns are compiled once
+    assert _compile_glob("*.Rproj") is _compile_glob("*.Rproj")
+
+
+def test_fused_name_criteria(example_fs_structure: pathlib.Path) -> None:
+    combined = (
+        HasFile("setup.py") | HasDir("a") | HasFileGlob("*.txt") | HasEntry("x")
+    ) | (HasFile("my_file") | HasFile("my_file", "a"))
+    assert isinstance(combined, AnyCriteria)
+    assert len(combined.criteria) == 6
+    # the cheap name checks are tested first, the contents last
+    assert [type(c) for c in combined._test_criteria] == [
+        FusedNameCriteria,
+        HasFileGlob,
+        HasFile,
+    ]
+    assert combined.test(example_fs_structure)
+    assert not combined.test(example_fs_structure / "a")
+
+    # nested groups are tested as one group, repeated criteria once
+    git = HasDir(".git") | HasFile(".git", "^gitdir: ")
+    nested = AnyCriteria(git, HasFile("setup.py"), git | HasDir(".svn"))
+    assert [type(c) for c in nested._test_criteria] == [FusedNameCriteria, HasFile]
+    assert len(nested._test_criteria[0].criteria) == 3
+    assert nested.describe() == (
+        "contains the directory `.git` or has a file `.git` and file contains a "
+        "line matching the regular expression `^gitdir: ` or has a file "
+        "`setup.py` or contains the directory `.git` or has a file `.git` and "
+        "file contains a line matching the regular expression `^gitdir: ` or "
+        "contains the directory `.svn`"
+    )
+
+    name_checks = HasFile("a") | HasDir("my_file") | HasEntry("b")
+    assert not name_checks.test(example_fs_structure)
+    assert name_checks.test_with_reason(example_fs_structure) == (
+        False,
+        "not (has a file `a`) and not (contains the directory `my_file`) "
+        "and not (contains the entry `b`)",
+    )
+    name_checks = HasFile("a") | HasDir("a") | HasFile("my_file")
+    assert name_checks.test(example_fs_structure)
+    assert name_checks.test_with_reason(example_fs_structure) == (
+        True,
+        "contains the directory `a`",
+    )
@@ -1,46 +1,78 @@
 import pathlib
+import typing
 
 import pytest
 
 from pyprojroot2 import here
 
 
-@pytest.mark.parametrize(
-    "project_files,file_type",
-    [
-        (".git", "dir"),
-        (".here", "file"),
-        ("my_project.Rproj", "file"),
-        ("requirements.txt", "file"),
-        ("setup.py", "file"),
-        (".dvc", "dir"),
-    ],
-)
-@pytest.mark.parametrize("child_dir", ["stuff", "src", "data", "data/hello"])
+def make_file(path: pathlib.Path) -> None:
+    path.write_text("blah")
+
+
+def make_dir(path: pathlib.Path) -> None:
+    path.mkdir(parents=True)
+
+
+PROJECT_FILES: typing.List[typing.Tuple[str, typing.Callable[[pathlib.Path], None]]] = [
+    (".git", make_dir),
+    (".here", make_file),
+    ("my_project.Rproj", make_file),
+    ("requirements.txt", make_file),
+    ("setup.py", make_file),
+    (".dvc", make_dir),
+]
+
+CHILD_DIRS = ["stuff", "src", "data", "data/hello"]
+
+
+@pytest.fixture(scope="session")
+def project_roots(
+    tmp_path_factory: pytest.TempPathFactory,
+) -> typing.Dict[str, pathlib.Path]:
+    """
+    One simulated project directory per project file, including all child
+    directories, created once and shared by the test cases.
+    """
+    roots = {}
+    for i, (project_files, make_project_file) in enumerate(PROJECT_FILES):
+        root = tmp_path_factory.mktemp(f"project{i}", numbered=False)
+        # Create project file
+        make_project_file(root / project_files)
+
+        # Create child dirs
+        for child_dir in CHILD_DIRS:
+            (root / child_dir).mkdir(parents=True, exist_ok=True)
+        roots[project_files] = root
+    return roots
+
+
+@pytest.mark.parametrize("project_files", [name for name, _ in PROJECT_FILES])
+@pytest.mark.parametrize("child_dir", CHILD_DIRS)
 def test_here(
-    tmp_path: pathlib.Path,
+    project_roots: typing.Dict[str, pathlib.Path],
     project_files: str,
-    file_type: str,
     child_dir: str,
     monkeypatch: pytest.MonkeyPatch,
 ) -> None:
     """
-    This test uses pytest's tmp_path facilities to create a simulated project
-    directory, and checks that the path is correct.
+    This test uses pytest's tmp_path facilities to create simulated project
+    directories, and checks that the path is correct.
     """
-    # Create project file
-    if file_type == "file":
-        (tmp_path / project_files).write_text("blah")
-    elif file_type == "dir":
-        (tmp_path / project_files).mkdir(parents=True)
-    else:
-        raise ValueError("Invalid input: {file_type}")
-
-    # Create child dirs
-    start_dir = tmp_path / child_dir
-    start_dir.mkdir(parents=True)
-    monkeypatch.chdir(start_dir)
+    project_root = project_roots[project_files]
+    monkeypatch.chdir(project_root / child_dir)
 
     # Verify the project against current work directory
     current_path = here()
-    assert current_path == tmp_path
+    assert current_path == project_root
+
+
+def test_here_project_files_retry(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # the project file is created after a failed attempt
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(FileNotFoundError):
+        here(project_files=("proj.toml",))
+    (tmp_path / "proj.toml").touch()
+    assert here(project_files=("proj.toml",)) == tmp_path
@@ -1,3 +1,5 @@
+import pathlib
+
 import pytest
 
 
@@ -13,11 +15,36 @@ def test_public_interface() -> None:
     assert callable(py_project_root)
 
 
-def test_legacy_import() -> None:
-    with pytest.warns(DeprecationWarning, match="legacy module"):
+def test_legacy_import(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    import warnings
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        from pyprojroot2 import pyprojroot
         from pyprojroot2.pyprojroot import here
 
     assert callable(here)
+    # restore the shims after the test
+    monkeypatch.setattr(pyprojroot, "here", pyprojroot.here)
+    monkeypatch.setattr(pyprojroot, "py_project_root", pyprojroot.py_project_root)
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "setup.py").touch()
+
+    # the first use warns
+    with pytest.warns(DeprecationWarning, match="legacy module"):
+        assert pyprojroot.here(warn=False) == tmp_path
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert pyprojroot.here(warn=False) == tmp_path
+
+    # imported names stay with the warnings filters
+    with pytest.warns(DeprecationWarning, match="legacy module"):
+        here(warn=False)
+    with pytest.warns(DeprecationWarning, match="legacy module"):
+        pyprojroot.py_project_root(tmp_path)
 
 
 def test_rprojroot_core_functions() -> None:
@@ -2,7 +2,7 @@ import pathlib
 
 import pytest
 
-from pyprojroot2 import py_here_criteria, rhere
+from pyprojroot2 import as_root_criterion, py_here_criteria, rhere
 
 
 @pytest.fixture
@@ -53,3 +53,23 @@ def test_rhere_default(rhere_setup: pathlib.Path) -> None:
 
     # git was the reason...
     assert ".git" in rhere.dr_here()
+
+    # the root is remembered for the current directory
+    (rhere_setup / ".git").rmdir()
+    assert rhere.here("something").is_file()
+
+
+def test_rhere_retry(rhere_setup: pathlib.Path) -> None:
+    # the marker is created after a failed attempt
+    with pytest.raises(FileNotFoundError):
+        rhere.i_am("marker.txt")
+    (rhere_setup / "marker.txt").touch()
+    assert rhere.i_am("marker.txt") == rhere_setup
+
+    # setting the criterion again starts afresh as well
+    rhere.set_root_crit(as_root_criterion("other.txt"))
+    with pytest.raises(FileNotFoundError):
+        rhere.here()
+    (rhere_setup / "other.txt").touch()
+    rhere.set_root_crit(as_root_criterion("other.txt"))
+    assert rhere.here() == rhere_setup